@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from backend.cache import is_shared_cache
+from recipes.versions import TOKENS_VERSION, bump_version, get_version
+
+User = get_user_model()
+
+
+class TokenCache:
+
+    def __init__(self, size, local_timeout, timeout, alias=None):
+        self.size = size
+        self.local_timeout = local_timeout
+        self.timeout = timeout
+        self.alias = alias
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def shared_cache(self):
+        if not self.alias or self.timeout <= 0:
+            return None
+        if not is_shared_cache(self.alias):
+            return None
+        return caches[self.alias]
+
+    def shared_key(self, key):
+        return f'auth-token:{key}'
+
+    def generation(self):
+        return get_version(TOKENS_VERSION)
+
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, entry_generation, user_id, is_active = entry
+                if expires > monotonic() and entry_generation == generation:
+                    self.entries.move_to_end(key)
+                    return user_id, is_active
+                del self.entries[key]
+        shared = self.shared_cache()
+        if shared is None:
+            return None
+        cached = shared.get(self.shared_key(key))
+        if cached is not None:
+            self.store(key, generation, *cached)
+        return cached
+
+    def set(self, key, generation, user_id, is_active):
+        self.store(key, generation, user_id, is_active)
+        shared = self.shared_cache()
+        if shared is not None:
+            shared.set(
+                self.shared_key(key), (user_id, is_active), self.timeout
+            )
+
+    def store(self, key, generation, user_id, is_active):
+        if self.size <= 0 or self.local_timeout <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (
+                monotonic() + self.local_timeout, generation, user_id,
+                is_active,
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        keys = list(keys)
+        if not keys:
+            return
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        shared = self.shared_cache()
+        if shared is not None:
+            shared.delete_many([self.shared_key(key) for key in keys])
+        bump_version(TOKENS_VERSION)
+
+
+token_cache = TokenCache(
+    settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_LOCAL_TIMEOUT,
+    settings.TOKEN_CACHE_TIMEOUT, settings.TOKEN_CACHE_ALIAS,
+)
+
+
+def cached_user(user_id, is_active):
+    values = {'id': user_id, 'is_active': is_active}
+    names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(None, names, [values[name] for name in names])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        generation = token_cache.generation()
+        cached = token_cache.get(key, generation)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, generation, user.id, user.is_active)
+            return user, token
+        user = cached_user(*cached)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        token = Token(key=key, user_id=user.id)
+        token.user = user
+        return user, token
@@ -0,0 +1,252 @@
+import base64
+from collections import namedtuple
+from contextlib import ExitStack
+from io import BytesIO
+from statistics import median
+from time import perf_counter
+
+from django.core.cache import caches
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import (APIClient, APIRequestFactory,
+                                 force_authenticate)
+
+from recipes.models import Recipe, User
+from recipes.similar import update_recipe
+from .views import RecipeViewSet
+
+Scenario = namedtuple('Scenario', 'name method path payload anonymous')
+Scenario.__new__.__defaults__ = (None, False)
+
+BENCHMARK_USER_ID = 1
+
+
+def image_payload():
+    buffer = BytesIO()
+    Image.new('RGB', (32, 32), 'orange').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+def recipe_payload(name, iteration, tag_ids, ingredient_ids):
+    shift = iteration % 2
+    return {
+        'name': f'{name} {iteration}',
+        'text': 'Описание тестового рецепта.',
+        'cooking_time': 10 + iteration,
+        'image': image_payload(),
+        'tags': tag_ids[shift:shift + 2],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10 + iteration}
+            for ingredient_id in ingredient_ids[shift:shift + 5]
+        ],
+    }
+
+
+def scenarios(scale):
+    middle_page = max(1, scale.recipes // 6 // 2)
+    tag_ids = [1, 2, 3]
+    ingredient_ids = list(range(1, 7))
+    return [
+        Scenario('recipes_list_anonymous', 'get', '/api/recipes/?limit=6',
+                 anonymous=True),
+        Scenario('recipes_list', 'get', '/api/recipes/?limit=6'),
+        Scenario('recipes_list_deep_page', 'get',
+                 f'/api/recipes/?limit=6&page={middle_page}'),
+        Scenario('recipes_list_tags', 'get',
+                 '/api/recipes/?limit=6&tags=tag-1&tags=tag-2'),
+        Scenario('recipes_list_favorited', 'get',
+                 '/api/recipes/?limit=6&is_favorited=1'),
+        Scenario('recipes_list_popular', 'get',
+                 '/api/recipes/?limit=6&ordering=-popularity'),
+        Scenario('recipes_search', 'get',
+                 '/api/recipes/?limit=6&search=борщ'),
+        Scenario('recipe_detail', 'get', f'/api/recipes/{scale.recipes}/'),
+        Scenario('recipes_feed', 'get', '/api/recipes/feed/?limit=6'),
+        Scenario('recipe_similar', 'get',
+                 f'/api/recipes/{scale.recipes}/similar/?limit=6'),
+        Scenario('subscriptions', 'get',
+                 '/api/users/subscriptions/?recipes_limit=3'),
+        Scenario('ingredients_search', 'get', '/api/ingredients/?name=со'),
+        Scenario('download_shopping_cart', 'get',
+                 '/api/recipes/download_shopping_cart/'),
+        Scenario('recipe_create', 'post', '/api/recipes/',
+                 lambda iteration: recipe_payload(
+                     'Новый рецепт', iteration, tag_ids, ingredient_ids
+                 )),
+        Scenario('recipe_update', 'patch', '/api/recipes/{created}/',
+                 lambda iteration: recipe_payload(
+                     'Изменённый рецепт', iteration, tag_ids, ingredient_ids
+                 )),
+    ]
+
+
+def serialization_scenarios(scale):
+    return [
+        scenario for scenario in scenarios(scale)
+        if scenario.path.startswith('/api/recipes/?')
+    ] + [
+        Scenario('recipes_list_100_anonymous', 'get',
+                 '/api/recipes/?limit=100', anonymous=True),
+        Scenario('recipes_list_100', 'get', '/api/recipes/?limit=100'),
+        Scenario('recipes_list_100_cursor', 'get',
+                 '/api/recipes/?limit=100&cursor='),
+    ]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def response_size(response):
+    if response.streaming:
+        return len(b''.join(response.streaming_content))
+    return len(response.content)
+
+
+class BenchmarkRunner:
+
+    def __init__(self, scale, repeat):
+        self.scale = scale
+        self.repeat = repeat
+        token, _ = Token.objects.get_or_create(user_id=BENCHMARK_USER_ID)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.anonymous_client = APIClient()
+        update_recipe(scale.recipes)
+        self.created = None
+        self.created_ids = []
+        self.create_scenario = next(
+            scenario for scenario in scenarios(scale)
+            if scenario.name == 'recipe_create'
+        )
+
+    def request(self, scenario, iteration):
+        client = (
+            self.anonymous_client if scenario.anonymous else self.client
+        )
+        path = scenario.path.format(created=self.created)
+        kwargs = {}
+        if scenario.payload:
+            kwargs = {'data': scenario.payload(iteration), 'format': 'json'}
+        started = perf_counter()
+        response = getattr(client, scenario.method)(path, **kwargs)
+        size = response_size(response)
+        elapsed = perf_counter() - started
+        if scenario.method == 'post' and response.status_code == 201:
+            self.created = response.json()['id']
+            self.created_ids.append(self.created)
+        return response.status_code, elapsed * 1000, size
+
+    def run_scenario(self, scenario):
+        if '{created}' in scenario.path and self.created is None:
+            self.request(self.create_scenario, 0)
+        for cache in caches.all():
+            cache.clear()
+        with ExitStack() as stack:
+            captures = []
+            for connection in connections.all():
+                connection.queries_log.clear()
+                captures.append(stack.enter_context(
+                    CaptureQueriesContext(connection)
+                ))
+            status, cold, size = self.request(scenario, 0)
+        query_count = sum(len(queries) for queries in captures)
+        timings = [
+            self.request(scenario, iteration)[1]
+            for iteration in range(1, self.repeat + 1)
+        ]
+        return {
+            'path': scenario.path.format(created=self.created),
+            'method': scenario.method.upper(),
+            'status': status,
+            'queries': query_count,
+            'size': size,
+            'cold_ms': round(cold, 3),
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'max_ms': round(max(timings), 3),
+        }
+
+    def run(self, names=None):
+        try:
+            return {
+                scenario.name: self.run_scenario(scenario)
+                for scenario in scenarios(self.scale)
+                if not names or scenario.name in names
+            }
+        finally:
+            Recipe.objects.filter(id__in=self.created_ids).delete()
+
+
+class SerializationBenchmark:
+
+    def __init__(self, scale, repeat):
+        self.scale = scale
+        self.repeat = repeat
+        self.user = User.objects.get(id=BENCHMARK_USER_ID)
+        self.factory = APIRequestFactory()
+        self.views = {
+            'serializers': RecipeViewSet.as_view(
+                {'get': 'list'}, fast_list=False,
+                renderer_classes=(JSONRenderer,),
+            ),
+            'fast': RecipeViewSet.as_view({'get': 'list'}),
+        }
+
+    def render(self, view, scenario):
+        request = self.factory.get(scenario.path)
+        if not scenario.anonymous:
+            force_authenticate(request, self.user)
+        for cache in caches.all():
+            cache.clear()
+        started = perf_counter()
+        response = view(request)
+        response.render()
+        return response.content, (perf_counter() - started) * 1000
+
+    def run_scenario(self, scenario):
+        result = {'path': scenario.path}
+        contents = {}
+        for name, view in self.views.items():
+            contents[name], _ = self.render(view, scenario)
+            timings = [
+                self.render(view, scenario)[1] for _ in range(self.repeat)
+            ]
+            result[f'{name}_median_ms'] = round(median(timings), 3)
+        result['size'] = len(contents['fast'])
+        result['identical'] = contents['fast'] == contents['serializers']
+        result['speedup'] = round(
+            result['serializers_median_ms'] / result['fast_median_ms'], 2
+        )
+        return result
+
+    def run(self):
+        return {
+            scenario.name: self.run_scenario(scenario)
+            for scenario in serialization_scenarios(self.scale)
+        }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['median_ms'] > previous['median_ms'] * tolerance:
+            regressions.append(
+                f'{name}: медиана {previous["median_ms"]} -> '
+                f'{result["median_ms"]} мс'
+            )
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов {previous["queries"]} -> '
+                f'{result["queries"]}'
+            )
+    return regressions
@@ -0,0 +1,283 @@
+import csv
+import json
+from functools import lru_cache
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+from recipes.models import ShoppingListItem
+from recipes.versions import (INGREDIENTS_VERSION, cart_version_name,
+                              get_version)
+
+SHOPPING_LIST_CHUNK_SIZE = 500
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+PDF_LINES_PER_PAGE = 50
+PDF_FONT_SIZE = 11
+PDF_CMAP_CHUNK_SIZE = 100
+PDF_TOUNICODE_CMAP = (
+    '/CIDInit /ProcSet findresource begin 12 dict begin begincmap '
+    '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> '
+    'def /CMapName /Adobe-Identity-UCS def /CMapType 2 def '
+    '1 begincodespacerange <0000> <FFFF> endcodespacerange\n{}'
+    'endcmap CMapName currentdict /CMap defineresource pop end end'
+)
+
+
+def shopping_list_rows(user):
+    items = ShoppingListItem.objects.filter(
+        user=user, amount__gt=0
+    ).order_by(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    ).iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+    for ingredient, measure, total_amount in items:
+        yield {
+            'ingredient': ingredient,
+            'measure': measure,
+            'total_amount': total_amount,
+        }
+
+
+def format_line(item):
+    return (
+        f'{item["ingredient"]} - {item["total_amount"]} '
+        f'{item["measure"]} \n'
+    )
+
+
+def render_txt(rows):
+    for item in rows:
+        yield format_line(item).encode()
+
+
+def render_csv(rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('ingredient', 'amount', 'measurement_unit'))
+    for item in rows:
+        writer.writerow(
+            (item['ingredient'], item['total_amount'], item['measure'])
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def render_json(rows):
+    separator = b'['
+    for item in rows:
+        yield separator + json.dumps({
+            'name': item['ingredient'],
+            'measurement_unit': item['measure'],
+            'amount': item['total_amount'],
+        }, ensure_ascii=False).encode()
+        separator = b','
+    yield b'[]' if separator == b'[' else b']'
+
+
+class PdfFont:
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = file.read()
+        font = TTFont(BytesIO(self.data), lazy=True)
+        scale = 1000 / font['head'].unitsPerEm
+        self.name = font['name'].getDebugName(6)
+        self.glyphs = {
+            code: font.getGlyphID(glyph)
+            for code, glyph in font.getBestCmap().items()
+        }
+        metrics = font['hmtx'].metrics
+        self.widths = [
+            round(metrics[glyph][0] * scale) for glyph in font.getGlyphOrder()
+        ]
+        head = font['head']
+        self.bbox = ' '.join(
+            str(round(value * scale))
+            for value in (head.xMin, head.yMin, head.xMax, head.yMax)
+        )
+        self.ascent = round(font['hhea'].ascent * scale)
+        self.descent = round(font['hhea'].descent * scale)
+        self.cap_height = round(
+            getattr(font['OS/2'], 'sCapHeight', 0) * scale
+        ) or self.ascent
+
+    def subset(self, glyphs):
+        options = subset.Options()
+        options.retain_gids = True
+        options.notdef_outline = True
+        options.layout_features = []
+        options.name_IDs = []
+        options.drop_tables += ['FFTM']
+        font = TTFont(BytesIO(self.data))
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(gids=sorted(glyphs))
+        subsetter.subset(font)
+        buffer = BytesIO()
+        font.save(buffer)
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def pdf_font():
+    return PdfFont(settings.SHOPPING_LIST_PDF_FONT)
+
+
+class PdfWriter:
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.font = pdf_font()
+        self.used = {0: ''}
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def object(self, number, body):
+        self.offsets[number] = self.position
+        return self.write(
+            f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+        )
+
+    def stream(self, number, data):
+        return self.object(
+            number,
+            f'<< /Length {len(data)} >>\nstream\n'.encode()
+            + data + b'\nendstream'
+        )
+
+    def text(self, line):
+        glyphs = []
+        for char in line.rstrip():
+            glyph = self.font.glyphs.get(ord(char), 0)
+            self.used.setdefault(glyph, char)
+            glyphs.append(f'{glyph:04X}')
+        return ''.join(glyphs).encode()
+
+    def page(self, number, lines):
+        content = (
+            f'BT /F1 {PDF_FONT_SIZE} Tf 14 TL 50 800 Td '.encode()
+            + b' T* '.join(b'<' + self.text(line) + b'> Tj' for line in lines)
+            + b' ET'
+        )
+        yield self.stream(number, content)
+        yield self.object(number + 1, (
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            '/Resources << /Font << /F1 3 0 R >> >> '
+            f'/Contents {number} 0 R >>'
+        ).encode())
+
+    def fonts(self, number):
+        font = self.font
+        name = f'FOODGR+{font.name}'
+        widths = ' '.join(
+            f'{glyph} [{font.widths[glyph]}]' for glyph in sorted(self.used)
+        )
+        yield self.object(3, (
+            f'<< /Type /Font /Subtype /Type0 /BaseFont /{name} '
+            f'/Encoding /Identity-H /DescendantFonts [{number} 0 R] '
+            f'/ToUnicode {number + 3} 0 R >>'
+        ).encode())
+        yield self.object(number, (
+            f'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name} '
+            '/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) '
+            '/Supplement 0 >> '
+            f'/FontDescriptor {number + 1} 0 R /CIDToGIDMap /Identity '
+            f'/DW 1000 /W [{widths}] >>'
+        ).encode())
+        yield self.object(number + 1, (
+            f'<< /Type /FontDescriptor /FontName /{name} /Flags 32 '
+            f'/FontBBox [{font.bbox}] /ItalicAngle 0 '
+            f'/Ascent {font.ascent} /Descent {font.descent} '
+            f'/CapHeight {font.cap_height} /StemV 80 '
+            f'/FontFile2 {number + 2} 0 R >>'
+        ).encode())
+        yield self.stream(number + 2, font.subset(self.used))
+        mapped = [
+            f'<{glyph:04X}> <{ord(char):04X}>'
+            for glyph, char in sorted(self.used.items())
+            if char and ord(char) <= 0xFFFF
+        ]
+        blocks = ''.join(
+            f'{len(chunk)} beginbfchar\n' + '\n'.join(chunk)
+            + '\nendbfchar\n'
+            for chunk in (
+                mapped[start:start + PDF_CMAP_CHUNK_SIZE]
+                for start in range(0, len(mapped), PDF_CMAP_CHUNK_SIZE)
+            )
+        )
+        yield self.stream(
+            number + 3, PDF_TOUNICODE_CMAP.format(blocks).encode()
+        )
+
+    def render(self, lines):
+        yield self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        yield self.object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        pages = []
+        page_lines = []
+        for line in lines:
+            page_lines.append(line)
+            if len(page_lines) == PDF_LINES_PER_PAGE:
+                pages.append(4 + 2 * len(pages))
+                yield from self.page(pages[-1], page_lines)
+                page_lines = []
+        if page_lines or not pages:
+            pages.append(4 + 2 * len(pages))
+            yield from self.page(pages[-1], page_lines)
+
+        kids = ' '.join(f'{page + 1} 0 R' for page in pages)
+        yield self.object(2, (
+            f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'
+        ).encode())
+        yield from self.fonts(4 + 2 * len(pages))
+
+        xref = self.position
+        size = max(self.offsets) + 1
+        yield self.write(
+            f'xref\n0 {size}\n0000000000 65535 f \n'.encode()
+            + b''.join(
+                f'{self.offsets[number]:010d} 00000 n \n'.encode()
+                for number in range(1, size)
+            )
+            + f'trailer\n<< /Size {size} /Root 1 0 R >>\n'
+              f'startxref\n{xref}\n%%EOF\n'.encode()
+        )
+
+
+def render_pdf(rows):
+    return PdfWriter().render(format_line(item) for item in rows)
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'json': (render_json, 'application/json'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+def shopping_list_cache_key(user, file_format):
+    return 'shopping_list:{}:{}:{}:{}'.format(
+        user.id,
+        get_version(cart_version_name(user.id)),
+        get_version(INGREDIENTS_VERSION),
+        file_format,
+    )
+
+
+def stream_shopping_list(chunks, cache_key=None):
+    parts = []
+    for chunk in chunks:
+        if cache_key is not None:
+            parts.append(chunk)
+        yield chunk
+    if cache_key is not None:
+        cache.set(cache_key, b''.join(parts), SHOPPING_LIST_CACHE_TIMEOUT)
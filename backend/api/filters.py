@@ -1,27 +1,67 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Exists, F, OuterRef, Subquery
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from backend.db.routers import read_from_primary
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from recipes.search import search_recipes
+from recipes.versions import TAGS_VERSION, get_version
 
 User = get_user_model()
 
+ADDED_AT_RELATIONS = {
+    'favorited_at': Favorite,
+    'added_to_cart_at': ShoppingCart,
+}
+ORDERING_CHOICES = (
+    ('favorited_at', 'Давно добавленные в избранное'),
+    ('-favorited_at', 'Недавно добавленные в избранное'),
+    ('added_to_cart_at', 'Давно добавленные в список покупок'),
+    ('-added_to_cart_at', 'Недавно добавленные в список покупок'),
+    ('popularity', 'Наименее популярные'),
+    ('-popularity', 'Самые популярные'),
+)
 
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
-    lookup_expr = 'icontains'
+
+def tag_ids_by_slug():
+    with read_from_primary():
+        return cache.get_or_set(
+            f'tag-slugs:{get_version(TAGS_VERSION)}',
+            lambda: dict(Tag.objects.values_list('slug', 'id')),
+        )
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids_by_slug()]
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags'
+    )
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=ORDERING_CHOICES, method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_in_shopping_cart', 'is_favorited']
+        fields = [
+            'tags', 'author', 'is_in_shopping_cart', 'is_favorited', 'search',
+            'ordering',
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = tag_ids_by_slug()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag__in=[tag_ids[slug] for slug in value if slug in tag_ids],
+        )))
 
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
@@ -32,3 +72,27 @@ class RecipeFilter(FilterSet):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(cart=self.request.user.id)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        if value.strip():
+            return search_recipes(queryset, value)
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        if value == '-popularity':
+            return queryset.order_by('-favorites_count', 'id')
+        if value == 'popularity':
+            return queryset.order_by('favorites_count', '-id')
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        field = value.lstrip('-')
+        relation = ADDED_AT_RELATIONS[field]
+        queryset = queryset.annotate(**{field: Subquery(
+            relation.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ).values('created_at')[:1]
+        )})
+        if value.startswith('-'):
+            return queryset.order_by(F(field).desc(nulls_last=True), 'id')
+        return queryset.order_by(F(field).asc(nulls_last=True), 'id')
@@ -0,0 +1,103 @@
+from recipes.models import AmountIngredient, Recipe, Tag
+from .performance import serializing
+from .serializers import image_variant_urls
+
+RECIPE_VALUES = (
+    'id', 'name', 'image', 'image_variants', 'text', 'cooking_time',
+    'pub_date', 'author_id', 'author__email', 'author__username',
+    'author__first_name', 'author__last_name',
+)
+TAG_VALUES = ('id', 'name', 'color', 'slug')
+
+
+def recipe_rows(queryset):
+    query = queryset.query
+    return queryset.prefetch_related(None).values(
+        *RECIPE_VALUES, *query.extra_select, *query.annotations
+    )
+
+
+def recipe_tags(recipe_ids):
+    through = Recipe.tags.through._meta.db_table
+    tags = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = Tag.objects.filter(recipes__in=recipe_ids).extra(
+        select={'recipe_id': f'{through}.recipe_id'}
+    ).order_by('id').values_list('recipe_id', *TAG_VALUES)
+    for recipe_id, *values in rows:
+        tags[recipe_id].append(dict(zip(TAG_VALUES, values)))
+    return tags
+
+
+def recipe_ingredients(recipe_ids):
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = AmountIngredient.objects.filter(
+        recipe__in=recipe_ids
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredients_id', 'ingredients__name',
+        'ingredients__measurement_unit', 'amount',
+    )
+    for recipe_id, ingredient_id, name, measurement_unit, amount in rows:
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+@serializing()
+def serialize_recipes(request, rows):
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+    if not recipe_ids:
+        return []
+    tags = recipe_tags(recipe_ids)
+    ingredients = recipe_ingredients(recipe_ids)
+    user = request.user
+    anonymous = user.is_anonymous
+    storage = Recipe._meta.get_field('image').storage
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'tags': tags[row['id']],
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': not anonymous and (
+                    row['author_id'] != user.id and row['author_subscribed']
+                ),
+            },
+            'ingredients': ingredients[row['id']],
+            'is_favorited': not anonymous and row['is_favorited'],
+            'is_in_shopping_cart': (
+                not anonymous and row['is_in_shopping_cart']
+            ),
+            'image': request.build_absolute_uri(
+                storage.url(row['image'])
+            ) if row['image'] else None,
+            'image_variants': image_variant_urls(
+                request, row['image_variants']
+            ),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
+
+
+def serialize_recipe_ids(request, recipe_ids):
+    rows = {
+        row['id']: row for row in recipe_rows(
+            Recipe.objects.with_user_flags(request.user).filter(
+                id__in=recipe_ids
+            )
+        )
+    }
+    return serialize_recipes(request, [
+        rows[recipe_id] for recipe_id in recipe_ids if recipe_id in rows
+    ])
@@ -0,0 +1,165 @@
+import json
+import platform
+import shutil
+import tempfile
+from datetime import datetime
+from time import monotonic
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmarks import (BenchmarkRunner, SerializationBenchmark,
+                            compare, scenarios)
+from recipes.datasets import SCALES, build_dataset, dataset_exists
+from recipes.feed import recipe_published
+from recipes.images import schedule_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит воспроизводимый набор данных в тестовой базе, замеряет '
+        'время и число SQL-запросов основных эндпоинтов и пишет JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='1k')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанные сценарии.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл результатов; по умолчанию benchmark-<scale>.json.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Прошлый файл результатов для поиска регрессий.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.25,
+            help='Во сколько раз может вырасти медиана без регрессии.',
+        )
+        parser.add_argument(
+            '--serialization', action='store_true',
+            help='Сравнить ответ и время списка рецептов через сериализаторы '
+                 'и через быстрый путь.',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу и переиспользовать набор данных.',
+        )
+
+    def handle(self, *args, **options):
+        known = {scenario.name for scenario in scenarios(SCALES['1k'])}
+        unknown = set(options['scenarios'] or ()) - known
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {sorted(unknown)}')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        scale = SCALES[options['scale']]
+        media_root = tempfile.mkdtemp(prefix='foodgram-benchmark-')
+        post_save.disconnect(schedule_variants, sender=Recipe)
+        post_save.disconnect(recipe_published, sender=Recipe)
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].creation.set_as_test_mirror(
+                connection.settings_dict
+            )
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root, SIMILAR_RECIPES_LIVE_UPDATES=False
+            ):
+                report = self.benchmark(scale, options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+            post_save.connect(schedule_variants, sender=Recipe)
+            post_save.connect(recipe_published, sender=Recipe)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        output = options['output'] or f'benchmark-{options["scale"]}.json'
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {output}'))
+
+        different = [
+            name for name, result in report.get('serialization', {}).items()
+            if not result['identical']
+        ]
+        if different:
+            raise CommandError(
+                'Быстрый путь отличается от сериализаторов: '
+                + ', '.join(different)
+            )
+
+        if baseline is not None:
+            regressions = compare(
+                report['results'], baseline['results'], options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def benchmark(self, scale, options):
+        started = monotonic()
+        if not (options['keepdb'] and dataset_exists(scale)):
+            build_dataset(scale, options['seed'], options['batch_size'])
+        build_time = monotonic() - started
+        self.stdout.write(
+            f'Набор данных {options["scale"]} готов за {build_time:.1f} с'
+        )
+
+        results = BenchmarkRunner(scale, options['repeat']).run(
+            options['scenarios']
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<28} {result["status"]} '
+                f'{result["queries"]:>3} запр. '
+                f'медиана {result["median_ms"]:>9.2f} мс '
+                f'p95 {result["p95_ms"]:>9.2f} мс'
+            )
+        report = {
+            'scale': options['scale'],
+            'dataset': scale._asdict(),
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'dataset_build_s': round(build_time, 3),
+            'results': results,
+        }
+        if options['serialization']:
+            report['serialization'] = SerializationBenchmark(
+                scale, options['repeat']
+            ).run()
+            for name, result in report['serialization'].items():
+                self.stdout.write(
+                    f'{name:<28} сериализаторы '
+                    f'{result["serializers_median_ms"]:>8.2f} мс, быстрый '
+                    f'путь {result["fast_median_ms"]:>8.2f} мс '
+                    f'(x{result["speedup"]}), '
+                    f'{"совпадает" if result["identical"] else "ОТЛИЧАЕТСЯ"}'
+                )
+        return report
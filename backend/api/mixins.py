@@ -1,12 +1,68 @@
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
-                                   HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED)
+                                   HTTP_304_NOT_MODIFIED, HTTP_400_BAD_REQUEST,
+                                   HTTP_401_UNAUTHORIZED)
+
+from backend.db.routers import read_from_primary
+from recipes.models import Favorite, ShoppingCart
+from recipes.relations import (Relation, add_relations, relations_changed,
+                               remove_relations)
+from recipes.versions import get_version, versions_shared
+from .serializers import IdListSerializer
+
+User = get_user_model()
 
 
 class AddDelViewMixin:
 
     add_serializer = None
+    relations = {
+        'subscribe': Relation(
+            User.subscribe.through, 'from_user', 'to_user',
+            'subscribers_count', False,
+        ),
+        'favorite': Relation(
+            Favorite, 'user', 'recipe', 'favorites_count', True,
+        ),
+        'shopping_cart': Relation(
+            ShoppingCart, 'user', 'recipe', 'in_carts_count', True,
+        ),
+    }
+
+    @staticmethod
+    def update_counter(model, obj_ids, counter, delta):
+        model.objects.filter(id__in=obj_ids).update(
+            **{counter: Greatest(F(counter) + delta, 0)}
+        )
+
+    def change_relations(self, manager, obj_ids, add):
+        relation = self.relations[manager]
+        user = self.request.user
+        change = add_relations if add else remove_relations
+        with transaction.atomic():
+            changed = change(relation, user.id, obj_ids)
+            if changed:
+                self.update_counter(
+                    self.queryset.model, changed, relation.counter,
+                    1 if add else -1,
+                )
+            relations_changed(
+                relation, user, 'post_add' if add else 'post_remove', changed
+            )
+        return changed
 
     def add_del_obj(self, obj_id, manager):
         assert self.add_serializer is not None, (
@@ -17,25 +73,107 @@ class AddDelViewMixin:
         user = self.request.user
         if user.is_anonymous:
             return Response(status=HTTP_401_UNAUTHORIZED)
+        try:
+            obj_id = int(obj_id)
+        except ValueError:
+            raise Http404
+        context = self.get_serializer_context()
+
+        add = self.request.method == 'POST'
+        if self.change_relations(manager, [obj_id], add):
+            if not add:
+                return Response(status=HTTP_204_NO_CONTENT)
+            obj = get_object_or_404(self.queryset, id=obj_id)
+            serializer = self.add_serializer(obj, context=context)
+            return Response(serializer.data, status=HTTP_201_CREATED)
+        get_object_or_404(self.queryset, id=obj_id)
+        return Response(status=HTTP_400_BAD_REQUEST)
+
+    def add_del_objs(self, manager):
+        user = self.request.user
+        if user.is_anonymous:
+            return Response(status=HTTP_401_UNAUTHORIZED)
+        data = self.request.data
+        if isinstance(data, list):
+            data = {'ids': data}
+        serializer = IdListSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        obj_ids = sorted(set(serializer.validated_data['ids']))
+
+        if self.request.method == 'POST':
+            added = self.change_relations(manager, obj_ids, True)
+            return Response({'added': added})
+        removed = self.change_relations(manager, obj_ids, False)
+        return Response({'removed': removed})
+
+
+class ConditionalListMixin:
+
+    version_name = None
+    cache_max_age = 0
+    rendered_cache_size = 256
+
+    _rendered = OrderedDict()
+    _rendered_lock = Lock()
+
+    def list_data(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_serializer(queryset, many=True).data
 
-        managers = {
-            'subscribe': user.subscribe,
-            'favorite': user.favorites,
-            'shopping_cart': user.carts,
-        }
-        manager = managers[manager]
+    def render_list(self, request):
+        with read_from_primary():
+            return request.accepted_renderer.render(self.list_data())
 
-        obj = get_object_or_404(self.queryset, id=obj_id)
-        serializer = self.add_serializer(
-            obj, context={'request': self.request}
+    def rendered_list(self, request, key):
+        with self._rendered_lock:
+            content = self._rendered.get(key)
+            if content is not None:
+                self._rendered.move_to_end(key)
+                return content
+        content = self.render_list(request)
+        with self._rendered_lock:
+            self._rendered[key] = content
+            while len(self._rendered) > self.rendered_cache_size:
+                self._rendered.popitem(last=False)
+        return content
+
+    def list(self, request, *args, **kwargs):
+        assert self.version_name is not None, (
+            f'{self.__class__.__name__} should include '
+            'a `version_name` attribute.'
         )
-        obj_exist = manager.filter(id=obj_id).exists()
 
-        if (self.request.method in ('GET', 'POST',)) and not obj_exist:
-            manager.add(obj)
-            return Response(serializer.data, status=HTTP_201_CREATED)
+        path = md5(request.get_full_path().encode()).hexdigest()
+        is_json = isinstance(request.accepted_renderer, JSONRenderer)
+        content = None
+        if versions_shared():
+            version = get_version(self.version_name)
+            etag = f'"{self.version_name}-{version}-{path[:16]}"'
+        elif is_json:
+            content = self.render_list(request)
+            etag = f'"{self.version_name}-{md5(content).hexdigest()[:16]}"'
+        else:
+            return Response(self.list_data())
 
-        if (self.request.method in ('DELETE',)) and obj_exist:
-            manager.remove(obj)
-            return Response(status=HTTP_204_NO_CONTENT)
-        return Response(status=HTTP_400_BAD_REQUEST)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            response = HttpResponse(status=HTTP_304_NOT_MODIFIED)
+        elif is_json:
+            if content is None:
+                content = self.rendered_list(
+                    request, (self.version_name, version, path)
+                )
+            response = HttpResponse(
+                content, content_type=request.accepted_renderer.media_type
+            )
+        else:
+            response = Response(self.list_data())
+
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=self.cache_max_age,
+            must_revalidate=True
+        )
+        return response
@@ -1,6 +1,202 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from heapq import merge
+from itertools import islice
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+MAX_CURSOR_INTEGER = 2 ** 63 - 1
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
+
+
+class KeysetPagination(BasePagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', 'id')
+    conflicting_params = ('ordering', 'search')
+    invalid_cursor_message = 'Неверный курсор.'
+    conflicting_param_message = (
+        'Параметр {} нельзя использовать вместе с курсором.'
+    )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        position = [
+            obj[field.lstrip('-')] if isinstance(obj, dict)
+            else getattr(obj, field.lstrip('-'))
+            for field in self.ordering
+        ]
+        position = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in position
+        ]
+        cursor = json.dumps([position, reverse])
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            urlsafe_b64encode(cursor.encode()).decode(),
+        )
+
+    def cursor_model(self, queryset):
+        return queryset.model
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            position, reverse = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (BinasciiError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not (
+            isinstance(position, list) and isinstance(reverse, bool)
+            and len(position) == len(self.ordering) and None not in position
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for field, value in zip(self.ordering, position):
+            field = model._meta.get_field(field.lstrip('-'))
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if isinstance(value, int) and abs(value) > MAX_CURSOR_INTEGER:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values, reverse
+
+    def fetch(self, queryset, ordering, position, limit):
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        return list(queryset.order_by(*ordering)[:limit])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        for param in self.conflicting_params:
+            if request.query_params.get(param):
+                raise ValidationError({
+                    param: self.conflicting_param_message.format(param)
+                })
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request, self.cursor_model(queryset)
+        )
+
+        ordering = self.ordering
+        if reverse:
+            ordering = self.reverse_ordering(ordering)
+        page = self.fetch(queryset, ordering, position, page_size + 1)
+        has_more = len(page) > page_size
+        page = page[:page_size]
+
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class MergedKeysetPagination(KeysetPagination):
+    ordering = ('-pub_date', '-recipe_id')
+
+    def cursor_model(self, querysets):
+        return querysets[0].model
+
+    def fetch(self, querysets, ordering, position, limit):
+        fields = [field.lstrip('-') for field in ordering]
+        rows, seen = [], set()
+        while True:
+            batch = list(islice(merge(
+                *(
+                    super(MergedKeysetPagination, self).fetch(
+                        queryset, ordering, position, limit
+                    )
+                    for queryset in querysets
+                ),
+                key=lambda row: [row[field] for field in fields],
+                reverse=ordering[0].startswith('-'),
+            ), limit))
+            for row in batch:
+                if row['recipe_id'] not in seen:
+                    seen.add(row['recipe_id'])
+                    rows.append(row)
+            if len(rows) >= limit or len(batch) < limit:
+                return rows[:limit]
+            position = [batch[-1][field] for field in fields]
+
+
+class LimitPageNumberOrCursorPagination(LimitPageNumberPagination):
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in (
+            request.query_params
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,300 @@
+import atexit
+import logging
+import os
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.serializers import BaseSerializer
+
+from backend.metrics import merge_snapshots, read_snapshot, write_snapshot
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+METRICS_FLUSH_SECONDS = 1
+
+logger = logging.getLogger(__name__)
+current_stats = ContextVar('request_stats', default=None)
+
+
+def enabled():
+    return getattr(settings, 'PERFORMANCE_METRICS', False)
+
+
+def metrics_dir():
+    return getattr(settings, 'PERFORMANCE_METRICS_DIR', '')
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.view_started = None
+        self.view_time = None
+        self.action = None
+
+    def finish_view(self):
+        if self.view_started is not None and self.view_time is None:
+            self.view_time = perf_counter() - self.view_started
+
+
+class Histogram:
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.queries = 0
+
+    def observe(self, seconds, queries):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.queries += queries
+
+    def snapshot(self):
+        return {
+            'buckets': list(self.buckets),
+            'total': self.total,
+            'count': self.count,
+            'queries': self.queries,
+        }
+
+
+class Registry:
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = Lock()
+        self.flushed = None
+
+    def observe(self, action, seconds, queries):
+        with self.lock:
+            histogram = self.histograms.get(action)
+            if histogram is None:
+                histogram = self.histograms[action] = Histogram()
+            histogram.observe(seconds, queries)
+            due = self.flushed is None or (
+                perf_counter() - self.flushed >= METRICS_FLUSH_SECONDS
+            )
+        if due and metrics_dir():
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                action: histogram.snapshot()
+                for action, histogram in self.histograms.items()
+            }
+
+    def flush(self):
+        directory = metrics_dir()
+        if not directory or not self.histograms:
+            return
+        self.flushed = perf_counter()
+        write_snapshot(
+            os.path.join(directory, f'{os.getpid()}.json'), self.snapshot()
+        )
+
+    def collect(self):
+        directory = metrics_dir()
+        if not directory:
+            return self.snapshot(), f',pid="{os.getpid()}"'
+        self.flush()
+        return merge_snapshots(
+            read_snapshot(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory))
+            if name.endswith('.json')
+        ), ''
+
+    def render(self):
+        lines = [
+            '# HELP foodgram_request_duration_seconds '
+            'Время обработки запроса представлением.',
+            '# TYPE foodgram_request_duration_seconds histogram',
+        ]
+        queries = [
+            '# HELP foodgram_request_queries_total '
+            'Количество SQL-запросов.',
+            '# TYPE foodgram_request_queries_total counter',
+        ]
+        histograms, process = self.collect()
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        for action, histogram in sorted(histograms.items()):
+            label = f'action="{action}"{process}'
+            cumulative = 0
+            for bound, count in zip(bounds, histogram['buckets']):
+                cumulative += count
+                lines.append(
+                    'foodgram_request_duration_seconds_bucket'
+                    f'{{{label},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'foodgram_request_duration_seconds_sum{{{label}}} '
+                f'{histogram["total"]:.6f}'
+            )
+            lines.append(
+                f'foodgram_request_duration_seconds_count{{{label}}} '
+                f'{histogram["count"]}'
+            )
+            queries.append(
+                f'foodgram_request_queries_total{{{label}}} '
+                f'{histogram["queries"]}'
+            )
+        return '\n'.join(lines + queries) + '\n'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+@contextmanager
+def serializing():
+    stats = current_stats.get()
+    if stats is None:
+        yield
+        return
+    stats.serializer_depth += 1
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_depth -= 1
+        if not stats.serializer_depth:
+            stats.serializer_time += perf_counter() - started
+
+
+def timed_data(data):
+
+    def wrapper(serializer):
+        with serializing():
+            return data.fget(serializer)
+
+    wrapper.instrumented = True
+    return property(wrapper)
+
+
+def instrument_serializers():
+    if not getattr(BaseSerializer.data.fget, 'instrumented', False):
+        BaseSerializer.data = timed_data(BaseSerializer.data)
+
+
+def view_action(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+def execute_wrapper(stats):
+
+    def wrapper(execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.queries += 1
+            stats.sql_time += perf_counter() - started
+
+    return wrapper
+
+
+class PerformanceMiddleware:
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        instrument_serializers()
+        self.get_response = get_response
+        self.slow_request_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrapper = execute_wrapper(stats)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        stats.finish_view()
+        total = perf_counter() - started
+        self.report(request, response, stats, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.action = view_action(request, view_func)
+            stats.view_started = perf_counter()
+
+    def process_template_response(self, request, response):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.finish_view()
+        return response
+
+    def report(self, request, response, stats, total):
+        action = stats.action or 'unresolved'
+        view_time = stats.view_time if stats.view_time is not None else total
+        size = None if response.streaming else len(response.content)
+        metrics = [
+            f'db;dur={stats.sql_time * 1000:.1f};'
+            f'desc="{stats.queries} queries"',
+            f'serializer;dur={stats.serializer_time * 1000:.1f}',
+            f'view;dur={view_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        if size is not None:
+            metrics.append(f'size;desc="{size} bytes"')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        registry.observe(action, view_time, stats.queries)
+        if total * 1000 >= self.slow_request_ms:
+            logger.warning(
+                'slow request action=%s method=%s path=%s status=%s '
+                'total_ms=%.1f view_ms=%.1f sql_ms=%.1f queries=%d '
+                'serializer_ms=%.1f size=%s',
+                action, request.method, request.get_full_path(),
+                response.status_code, total * 1000, view_time * 1000,
+                stats.sql_time * 1000, stats.queries,
+                stats.serializer_time * 1000, size,
+                extra={
+                    'action': action,
+                    'path': request.path,
+                    'status_code': response.status_code,
+                    'total_ms': round(total * 1000, 1),
+                    'view_ms': round(view_time * 1000, 1),
+                    'sql_ms': round(stats.sql_time * 1000, 1),
+                    'queries': stats.queries,
+                    'serializer_ms': round(stats.serializer_time * 1000, 1),
+                    'response_size': size,
+                },
+            )
+
+
+@api_view(('GET',))
+@permission_classes((IsAdminUser,))
+def metrics(request):
+    if not enabled():
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
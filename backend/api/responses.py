@@ -0,0 +1,77 @@
+from hashlib import md5
+
+from django.core.cache import caches
+
+from recipes.versions import (INGREDIENTS_VERSION, POPULARITY_VERSION,
+                              RECIPES_VERSION, TAGS_VERSION,
+                              author_version_name, get_version, get_versions,
+                              recipe_version_name)
+
+RESPONSE_CACHE = 'responses'
+
+
+def response_cache():
+    return caches[RESPONSE_CACHE]
+
+
+def versioned_key(prefix, request, names, path=''):
+    versions = '-'.join(str(version) for version in get_versions(names))
+    origin = request.build_absolute_uri('/')
+    digest = md5(f'{origin}{path}'.encode()).hexdigest()
+    return f'{prefix}:{versions}:{digest}'
+
+
+def recipe_detail_key(request, recipe_id):
+    return versioned_key(f'recipe:{recipe_id}', request, (
+        recipe_version_name(recipe_id), TAGS_VERSION, INGREDIENTS_VERSION,
+    ))
+
+
+def recipe_list_key(request):
+    names = [RECIPES_VERSION, TAGS_VERSION, INGREDIENTS_VERSION]
+    if 'popularity' in request.query_params.get('ordering', ''):
+        names.append(POPULARITY_VERSION)
+    return versioned_key(
+        'recipes', request, names, path=request.get_full_path()
+    )
+
+
+def get_recipe_detail(key):
+    entry = response_cache().get(key)
+    if entry is None:
+        return None
+    author_id, author_version, data = entry
+    if author_version != get_version(author_version_name(author_id)):
+        return None
+    return data
+
+
+def set_recipe_detail(key, data):
+    author_id = data['author']['id']
+    response_cache().set(key, (
+        author_id, get_version(author_version_name(author_id)), data
+    ))
+
+
+def merge_user_flags(user, recipes):
+    if user.is_anonymous or not recipes:
+        return recipes
+    recipe_ids = [recipe['id'] for recipe in recipes]
+    author_ids = {recipe['author']['id'] for recipe in recipes}
+    favorited = set(
+        user.favorites.filter(id__in=recipe_ids).values_list('id', flat=True)
+    )
+    in_cart = set(
+        user.carts.filter(id__in=recipe_ids).values_list('id', flat=True)
+    )
+    subscribed = set(
+        user.subscribe.filter(id__in=author_ids).values_list('id', flat=True)
+    )
+    subscribed.discard(user.id)
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in favorited
+        recipe['is_in_shopping_cart'] = recipe['id'] in in_cart
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in subscribed
+        )
+    return recipes
@@ -0,0 +1,77 @@
+from bisect import bisect_left
+from math import inf
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from backend.db.routers import read_from_primary
+from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS_VERSION, get_version, versions_shared
+from .utils import incorrect_layout
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    @read_from_primary()
+    def _build(self, version):
+        rows = list(Ingredient.objects.order_by('id').values(
+            'id', 'name', 'measurement_unit'
+        ))
+        rows_by_key = sorted(rows, key=lambda row: row['name'].lower())
+        keys = [row['name'].lower() for row in rows_by_key]
+        expires = inf
+        if not versions_shared():
+            expires = monotonic() + settings.INGREDIENT_INDEX_TIMEOUT
+        return version, expires, rows, keys, rows_by_key
+
+    def _is_current(self, index, version):
+        return (
+            index is not None and index[0] == version
+            and index[1] > monotonic()
+        )
+
+    def _current(self):
+        version = get_version(INGREDIENTS_VERSION)
+        index = self._index
+        if self._is_current(index, version):
+            return index
+        with self._lock:
+            index = self._index
+            if not self._is_current(index, version):
+                index = self._build(version)
+                self._index = index
+        return index
+
+    def _lookup(self, index, query):
+        _, _, _, keys, rows_by_key = index
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        prefix = rows_by_key[start:end]
+        contains = [
+            row for key, row in zip(keys, rows_by_key)
+            if query in key and not key.startswith(query)
+        ]
+        return prefix + contains
+
+    def search(self, query=None):
+        index = self._current()
+        if not query:
+            return index[2]
+        query = query.strip().lower()
+        return (
+            self._lookup(index, query)
+            or self._lookup(index, query.translate(incorrect_layout))
+        )
+
+    def invalidate(self):
+        self._index = None
+
+
+ingredient_index = IngredientIndex()
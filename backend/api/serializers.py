@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.db.models import F
 from drf_extra_fields.fields import Base64ImageField
+from rest_framework.serializers import Field, ListField, Serializer
 from rest_framework.serializers import ModelSerializer
 from rest_framework.serializers import SerializerMethodField
 from rest_framework.serializers import ValidationError
@@ -10,15 +13,51 @@ from rest_framework.serializers import IntegerField
 from rest_framework.serializers import SlugRelatedField
 
 from recipes.models import Ingredient, Recipe, Tag, AmountIngredient
-from .utils import (is_hex_color)
+from recipes.shopping_list import (add_recipe_to_lists,
+                                   remove_recipe_from_lists)
+from recipes.similar import schedule_update
+from recipes.versions import bump_recipe_cart_versions
+from .utils import is_hex_color
 
 User = get_user_model()
 
 
+def image_variant_urls(request, value):
+    return {
+        width: {
+            extension: request.build_absolute_uri(default_storage.url(path))
+            for extension, path in formats.items()
+        }
+        for width, formats in value.get('widths', {}).items()
+    }
+
+
+class ImageVariantsField(Field):
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return image_variant_urls(self.context.get('request'), value)
+
+
+class IdListSerializer(Serializer):
+    ids = ListField(
+        child=IntegerField(min_value=1), min_length=1, max_length=1000
+    )
+
+
+class RecipesLimitSerializer(Serializer):
+    recipes_limit = IntegerField(min_value=0, required=False)
+
+
 class ShortRecipeSerializer(ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = 'id', 'name', 'image', 'cooking_time'
+        fields = 'id', 'name', 'image', 'image_variants', 'cooking_time'
         read_only_fields = '__all__',
 
 
@@ -43,6 +82,9 @@ class UserSerializer(ModelSerializer):
         user = self.context.get('request').user
         if user.is_anonymous or (user == obj):
             return False
+        subscribed = getattr(obj, 'subscribed', None)
+        if subscribed is not None:
+            return subscribed
         return user.subscribe.filter(id=obj.id).exists()
 
     def create(self, validated_data):
@@ -76,18 +118,17 @@ class UserSubscribeSerializer(UserSerializer):
         read_only_fields = '__all__',
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
         request = self.context.get('request', )
         if not request or request.user.is_anonymous:
             return False
         context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit', )
+        recipes = obj.recipes.all()
+        recipes_limit = self.context.get('recipes_limit')
         if recipes_limit is not None:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
-        else:
-            recipes = obj.recipes.all()
+            recipes = recipes[:recipes_limit]
         return ShortRecipeSerializer(recipes, many=True, context=context).data
 
 
@@ -137,33 +178,47 @@ class RecipeReadSerializer(ModelSerializer):
     ingredients = SerializerMethodField(read_only=True)
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'name', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'image', 'text', 'cooking_time',
+            'is_in_shopping_cart', 'image', 'image_variants', 'text',
+            'cooking_time',
         )
 
     def get_ingredients(self, obj):
-        queryset = AmountIngredient.objects.filter(recipe=obj)
+        queryset = obj.ingredient.all()
         return RecipeIngredientReadSerializer(queryset, many=True).data
 
     def get_is_favorited(self, obj):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        is_favorited = getattr(obj, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
         return user.favorites.filter(id=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         return user.carts.filter(id=obj.id).exists()
 
+    def to_representation(self, instance):
+        author_subscribed = getattr(instance, 'author_subscribed', None)
+        if author_subscribed is not None:
+            instance.author.subscribed = author_subscribed
+        return super().to_representation(instance)
+
 
 class RecipeIngredientWriteSerializer(ModelSerializer):
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = IntegerField()
 
     class Meta:
         model = AmountIngredient
@@ -226,6 +281,15 @@ class RecipeSerializer(ModelSerializer):
                 raise ValidationError({
                     'amount': 'Количество ингредиента должно быть больше нуля!'
                 })
+        missing = set(ingredients_list) - set(
+            Ingredient.objects.filter(
+                id__in=ingredients_list
+            ).values_list('id', flat=True)
+        )
+        if missing:
+            raise ValidationError({
+                'ingredient': f'Ингредиенты не найдены: {sorted(missing)}'
+            })
         return data
 
     def validate_tags(self, data):
@@ -242,18 +306,56 @@ class RecipeSerializer(ModelSerializer):
 
     @staticmethod
     def create_ingredients(ingredients, recipe):
-        for ingredient in ingredients:
-            AmountIngredient.objects.create(
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
                 recipe=recipe,
-                ingredients=ingredient.get("id"),
+                ingredients_id=ingredient.get("id"),
                 amount=ingredient.get("amount"),
             )
+            for ingredient in ingredients
+        )
 
     @staticmethod
     def create_tags(tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        recipe.tags.add(*tags)
+
+    def update_ingredients(self, ingredients, recipe):
+        current = {
+            item.ingredients_id: item
+            for item in AmountIngredient.objects.filter(recipe=recipe)
+        }
+        new = {ingredient['id']: ingredient for ingredient in ingredients}
+
+        removed = current.keys() - new.keys()
+        added = new.keys() - current.keys()
+        changed = [
+            ingredient_id for ingredient_id in current.keys() & new.keys()
+            if current[ingredient_id].amount != new[ingredient_id]['amount']
+        ]
+        if not (removed or added or changed):
+            return
+        remove_recipe_from_lists(recipe.id)
+        if removed:
+            AmountIngredient.objects.filter(
+                recipe=recipe, ingredients__in=removed
+            ).delete()
+
+        for ingredient_id in changed:
+            current[ingredient_id].amount = new[ingredient_id]['amount']
+        if changed:
+            AmountIngredient.objects.bulk_update(
+                [current[ingredient_id] for ingredient_id in changed],
+                ('amount',),
+            )
 
+        self.create_ingredients(
+            (new[ingredient_id] for ingredient_id in added), recipe
+        )
+        add_recipe_to_lists(recipe.id)
+        recipe_id = recipe.id
+        transaction.on_commit(lambda: bump_recipe_cart_versions(recipe_id))
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
@@ -261,17 +363,26 @@ class RecipeSerializer(ModelSerializer):
         recipe = Recipe.objects.create(author=author, **validated_data)
         self.create_tags(tags, recipe)
         self.create_ingredients(ingredients, recipe)
+        schedule_update(recipe.id)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        AmountIngredient.objects.filter(recipe=instance).delete()
-        self.create_tags(validated_data.pop('tags'), instance)
-        self.create_ingredients(validated_data.pop('ingredients'), instance)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        ingredients = validated_data.pop('ingredients', None)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
+        if tags is not None or ingredients is not None:
+            schedule_update(instance.id)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_user_data(request.user).get(
+            pk=instance.pk
+        )
         return RecipeReadSerializer(
             instance, context=context).data
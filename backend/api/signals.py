@@ -0,0 +1,120 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+from recipes.versions import (INGREDIENTS_VERSION, POPULARITY_VERSION,
+                              RECIPES_VERSION, TAGS_VERSION,
+                              author_version_name, bump_cart_versions,
+                              bump_recipe_versions, bump_version)
+from .authentication import token_cache
+from .search import ingredient_index
+
+User = get_user_model()
+
+LOGIN_FIELDS = {'last_login'}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+
+    def bump():
+        bump_version(INGREDIENTS_VERSION)
+        ingredient_index.invalidate()
+
+    transaction.on_commit(bump)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    transaction.on_commit(lambda: bump_version(TAGS_VERSION))
+
+
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def cart_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        user_ids = (instance.id,)
+    elif action == 'pre_clear':
+        user_ids = list(instance.cart.values_list('id', flat=True))
+    else:
+        user_ids = tuple(pk_set)
+    transaction.on_commit(lambda: bump_cart_versions(user_ids))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    user_ids = list(User.objects.filter(carts=instance).values_list(
+        'id', flat=True
+    ))
+    transaction.on_commit(lambda: bump_cart_versions(user_ids))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    recipe_id = instance.id
+    transaction.on_commit(lambda: bump_recipe_versions(recipe_id))
+
+
+@receiver((post_save, post_delete), sender=AmountIngredient)
+def recipe_ingredients_changed(instance, **kwargs):
+    recipe_id = instance.recipe_id
+    transaction.on_commit(lambda: bump_recipe_versions(recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse and pk_set is None:
+        transaction.on_commit(lambda: bump_version(TAGS_VERSION))
+        return
+    recipe_ids = tuple(pk_set) if reverse else (instance.id,)
+
+    def bump():
+        for recipe_id in recipe_ids:
+            bump_recipe_versions(recipe_id)
+
+    transaction.on_commit(bump)
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+def favorites_changed(action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: bump_version(POPULARITY_VERSION))
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= LOGIN_FIELDS:
+        return
+    user_id = instance.id
+
+    def bump():
+        bump_version(author_version_name(user_id))
+        bump_version(RECIPES_VERSION)
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    keys = (instance.key,)
+    token_cache.delete(keys)
+    transaction.on_commit(lambda: token_cache.delete(keys))
+
+
+@receiver(post_save, sender=User)
+def token_user_changed(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= LOGIN_FIELDS:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        token_cache.delete(keys)
+        transaction.on_commit(lambda: token_cache.delete(keys))
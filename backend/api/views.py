@@ -1,19 +1,37 @@
-from django.db.models import F, Sum
-from django.http.response import HttpResponse
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
+from django.http.response import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework.decorators import action
-from .paginators import LimitPageNumberPagination
+from rest_framework.permissions import SAFE_METHODS
+from .paginators import (LimitPageNumberOrCursorPagination,
+                         MergedKeysetPagination)
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
-from .filters import RecipeFilter, IngredientSearchFilter
-from .mixins import AddDelViewMixin
+from backend.db.routers import read_from_primary
+from recipes.feed import feed_sources
+from recipes.models import Ingredient, Recipe, SimilarRecipe, Tag
+from recipes.versions import INGREDIENTS_VERSION, TAGS_VERSION, versions_shared
+from .exports import (SHOPPING_LIST_FORMATS, shopping_list_cache_key,
+                      shopping_list_rows, stream_shopping_list)
+from .filters import RecipeFilter
+from .listing import recipe_rows, serialize_recipe_ids, serialize_recipes
+from .mixins import AddDelViewMixin, ConditionalListMixin
 from .permissions import AuthorOrReadOnly, IsAdminOrReadOnly
-from .serializers import (IngredientSerializer, RecipeSerializer,
+from .responses import (get_recipe_detail, merge_user_flags,
+                        recipe_detail_key, recipe_list_key, response_cache,
+                        set_recipe_detail)
+from .search import ingredient_index
+from .serializers import (IngredientSerializer, RecipeReadSerializer,
+                          RecipeSerializer, RecipesLimitSerializer,
                           ShortRecipeSerializer, TagSerializer,
                           UserSubscribeSerializer)
 
@@ -22,40 +40,60 @@ DATE_TIME_FORMAT = '%d/%m/%Y %H:%M'
 
 
 class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitPageNumberOrCursorPagination
+    cursor_ordering = ('username', 'id')
     add_serializer = UserSubscribeSerializer
 
-    @action(methods=('get', 'post', 'delete'), detail=True)
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('subscribe', 'subscriptions'):
+            serializer = RecipesLimitSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            context.update(serializer.validated_data)
+        return context
+
+    @action(methods=('post', 'delete'), detail=True)
     def subscribe(self, request, id):
         return self.add_del_obj(id, 'subscribe')
 
+    @action(methods=('post', 'delete'), detail=False, url_path='subscribe',
+            url_name='subscribe-bulk')
+    def subscribe_bulk(self, request):
+        return self.add_del_objs('subscribe')
+
     @action(detail=False,)
     def subscriptions(self, request):
         user = self.request.user
         if user.is_anonymous:
             return Response(status=HTTP_401_UNAUTHORIZED)
-        authors = user.subscribe.all()
+        context = self.get_serializer_context()
+        authors = user.subscribe.with_recipes(
+            user, context.get('recipes_limit')
+        )
         pages = self.paginate_queryset(authors)
         serializer = UserSubscribeSerializer(
-            pages, many=True, context={'request': request}
+            pages, many=True, context=context
         )
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ConditionalListMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+    version_name = TAGS_VERSION
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalListMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = [IngredientSearchFilter]
-    search_fields = ('^name',)
     pagination_class = None
+    version_name = INGREDIENTS_VERSION
+
+    def list_data(self):
+        return ingredient_index.search(self.request.query_params.get('name'))
 
 
 class RecipeViewSet(ModelViewSet, AddDelViewMixin):
@@ -64,37 +102,135 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
     permission_classes = (AuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitPageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', 'id')
     add_serializer = ShortRecipeSerializer
-
-    @action(methods=('get', 'post', 'delete'), detail=True)
+    fast_list = True
+
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return Recipe.objects.with_user_data(AnonymousUser())
+        if self.action == 'list':
+            return Recipe.objects.with_user_data(self.request.user)
+        return super().get_queryset()
+
+    def list_data(self):
+        if not self.fast_list:
+            return super().list(self.request).data
+        rows = recipe_rows(self.filter_queryset(
+            Recipe.objects.with_user_flags(self.request.user)
+        ))
+        page = self.paginate_queryset(rows)
+        data = serialize_recipes(self.request, rows if page is None else page)
+        if page is None:
+            return data
+        return self.get_paginated_response(data).data
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_anonymous or not versions_shared():
+            return Response(self.list_data())
+        key = recipe_list_key(request)
+        data = response_cache().get(key)
+        if data is None:
+            with read_from_primary():
+                data = self.list_data()
+            response_cache().set(key, data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = data = None
+        if versions_shared():
+            key = recipe_detail_key(request, kwargs['pk'])
+            data = get_recipe_detail(key)
+        if data is None:
+            with read_from_primary():
+                data = super().retrieve(request, *args, **kwargs).data
+            if key is not None:
+                set_recipe_detail(key, data)
+        merge_user_flags(request.user, (data,))
+        return Response(data)
+
+    def get_serializer_class(self):
+        if self.request.method in SAFE_METHODS:
+            return RecipeReadSerializer
+        return super().get_serializer_class()
+
+    @action(detail=False)
+    def feed(self, request):
+        user = request.user
+        if user.is_anonymous:
+            return Response(status=HTTP_401_UNAUTHORIZED)
+        paginator = MergedKeysetPagination()
+        entries = paginator.paginate_queryset(feed_sources(user), request)
+        return paginator.get_paginated_response(serialize_recipe_ids(
+            request, [entry['recipe_id'] for entry in entries]
+        ))
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        top = settings.SIMILAR_RECIPES_TOP
+        try:
+            limit = min(int(request.query_params.get('limit', top)), top)
+        except ValueError:
+            limit = top
+        recipe_ids = list(SimilarRecipe.objects.filter(recipe=pk).order_by(
+            '-score', 'similar'
+        ).values_list('similar', flat=True)[:max(limit, 0)])
+        if not recipe_ids:
+            get_object_or_404(Recipe, pk=pk)
+        return Response(serialize_recipe_ids(request, recipe_ids))
+
+    @action(methods=('post', 'delete'), detail=True)
     def favorite(self, request, pk):
         return self.add_del_obj(pk, 'favorite')
 
-    @action(methods=('get', 'post', 'delete'), detail=True)
+    @action(methods=('post', 'delete'), detail=True)
     def shopping_cart(self, request, pk):
         return self.add_del_obj(pk, 'shopping_cart')
 
+    @action(methods=('post', 'delete'), detail=False, url_path='favorite',
+            url_name='favorite-bulk')
+    def favorite_bulk(self, request):
+        return self.add_del_objs('favorite')
+
+    @action(methods=('post', 'delete'), detail=False,
+            url_path='shopping_cart', url_name='shopping-cart-bulk')
+    def shopping_cart_bulk(self, request):
+        return self.add_del_objs('shopping_cart')
+
     @action(methods=('get',), detail=False)
     def download_shopping_cart(self, request):
         user = self.request.user
-        if not user.carts.exists():
+        if user.is_anonymous:
+            return Response(status=HTTP_401_UNAUTHORIZED)
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
             return Response(status=HTTP_400_BAD_REQUEST)
-        ingredients = AmountIngredient.objects.filter(
-            recipe__in=(user.carts.values('id'))
-        ).values(
-            ingredient=F('ingredients__name'),
-            measure=F('ingredients__measurement_unit')
-        ).annotate(total_amount=Sum('amount'))
-
-        shopping_list = []
-        for item in ingredients:
-            shopping_list.append(
-                f'{item["ingredient"]} - {item["total_amount"]} '
-                f'{item["measure"]} \n'
-            )
+        render, content_type = SHOPPING_LIST_FORMATS[file_format]
 
-        response = HttpResponse(shopping_list, 'Content-Type: text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping_list.txt"')
+        cache_key = content = None
+        if versions_shared():
+            cache_key = shopping_list_cache_key(user, file_format)
+            content = cache.get(cache_key)
+        if content is None and not user.carts.exists():
+            return Response(status=HTTP_400_BAD_REQUEST)
+        if content is not None:
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            rows = shopping_list_rows(user)
+            if isinstance(request._request, ASGIRequest):
+                # Django 3.2 iterates streaming content on the event loop,
+                # where the ORM is not allowed, so only rendering streams.
+                rows = list(rows)
+            response = StreamingHttpResponse(
+                stream_shopping_list(render(rows), cache_key),
+                content_type=content_type,
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{file_format}"'
+        )
         return response
@@ -0,0 +1,13 @@
+import os
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
@@ -0,0 +1,132 @@
+import os
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions, extras
+
+Database = base.Database
+PING_IDLE_SECONDS = 30
+
+
+def connect(conn_params, isolation_level=None):
+    connection = Database.connect(**conn_params)
+    if (isolation_level is not None
+            and isolation_level != connection.isolation_level):
+        connection.set_session(isolation_level=isolation_level)
+    extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda value: value
+    )
+    return connection
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, size, timeout, max_age):
+        self.connect = connect
+        self.timeout = timeout
+        self.max_age = max_age
+        self.pid = os.getpid()
+        self.idle = []
+        self.created = {}
+        self.lock = Lock()
+        self.slots = BoundedSemaphore(size)
+
+    def expired(self, connection):
+        return monotonic() - self.created[connection] >= self.max_age
+
+    def healthy(self, connection, released):
+        if connection.closed or self.expired(connection):
+            return False
+        if monotonic() - released < PING_IDLE_SECONDS:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        self.created.pop(connection, None)
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def acquire(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'Нет свободных соединений в пуле за {self.timeout} с'
+            )
+        try:
+            while True:
+                with self.lock:
+                    if not self.idle:
+                        break
+                    connection, released = self.idle.pop()
+                if self.healthy(connection, released):
+                    return connection
+                self.discard(connection)
+            connection = self.connect()
+            self.created[connection] = monotonic()
+            return connection
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, connection):
+        if connection not in self.created:
+            connection.close()
+            return
+        try:
+            if connection.closed or self.expired(connection):
+                self.discard(connection)
+                return
+            status = connection.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                self.discard(connection)
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            with self.lock:
+                self.idle.append((connection, monotonic()))
+        finally:
+            self.slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pools = {}
+    pools_lock = Lock()
+
+    def get_pool(self, conn_params):
+        with self.pools_lock:
+            pool = self.pools.get(self.alias)
+            if pool is None or pool.pid != os.getpid():
+                options = self.settings_dict.get('POOL', {})
+                isolation_level = self.settings_dict['OPTIONS'].get(
+                    'isolation_level'
+                )
+                pool = ConnectionPool(
+                    lambda: connect(conn_params, isolation_level),
+                    options.get('SIZE', 20), options.get('TIMEOUT', 10),
+                    options.get('MAX_AGE', 600),
+                )
+                self.pools[self.alias] = pool
+            return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).acquire()
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        pool = self.pools.get(self.alias)
+        if pool is None or pool.pid != os.getpid():
+            return super()._close()
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                pool.release(self.connection)
+        return None
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import md5
+from random import choice
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.core.exceptions import MiddlewareNotUsed
+
+from backend.cache import is_shared_cache
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_MODELS = {'authtoken.token', 'sessions.session'}
+PIN_COOKIE = 'db_pin'
+
+read_database = ContextVar('read_database', default=None)
+
+
+def pin_key(request):
+    credentials = request.META.get('HTTP_AUTHORIZATION') or (
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return f'db-pin:{md5(credentials.encode()).hexdigest()}'
+
+
+def is_pinned(request, key):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    return bool(key) and is_shared_cache(DEFAULT_CACHE_ALIAS) and bool(
+        cache.get(key)
+    )
+
+
+def pin(response, key):
+    response.set_cookie(
+        PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True,
+        samesite='Lax',
+    )
+    if key and is_shared_cache(DEFAULT_CACHE_ALIAS):
+        cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+
+
+@contextmanager
+def read_from_primary():
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return 'default'
+        return read_database.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = pin_key(request)
+        alias = None
+        if request.method in SAFE_METHODS and not is_pinned(request, key):
+            alias = choice(settings.DATABASE_REPLICAS)
+        token = read_database.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        if request.method not in SAFE_METHODS:
+            pin(response, key)
+        return response
@@ -0,0 +1,47 @@
+import json
+import os
+
+ARCHIVE = 'archive.json'
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for action, values in snapshot.items():
+            current = merged.get(action)
+            if current is None:
+                merged[action] = dict(values, buckets=list(values['buckets']))
+                continue
+            current['buckets'] = [
+                first + second for first, second
+                in zip(current['buckets'], values['buckets'])
+            ]
+            for field in ('total', 'count', 'queries'):
+                current[field] += values[field]
+    return merged
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_snapshot(path, snapshot):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(temporary, path)
+
+
+def archive_worker(directory, pid):
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    archive = os.path.join(directory, ARCHIVE)
+    write_snapshot(archive, merge_snapshots(
+        (read_snapshot(archive), read_snapshot(path))
+    ))
+    os.remove(path)
@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+# Every request in flight holds a thread and a database connection, so
+# the per-worker limit is derived from the connection budget.
+db_connections = int(os.getenv('DB_MAX_CONNECTIONS', default=90))
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS',
+                         default='backend.workers.UvicornWorker')
+workers = int(os.getenv('GUNICORN_WORKERS',
+                        default=min(cpu_count, db_connections)))
+threads = int(os.getenv('GUNICORN_THREADS',
+                        default=max(1, db_connections // workers)))
+# The pool holds one connection per thread, so workers * threads is
+# also the number of connections a database server sees.
+os.environ['DB_POOL_SIZE'] = str(threads)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=10000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+# With PERFORMANCE_METRICS_DIR every worker writes its histograms there
+# and /api/metrics/ sums them; exited workers are folded into one file.
+metrics_dir = os.getenv('PERFORMANCE_METRICS_DIR', default='')
+
+
+def on_starting(server):
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from backend.metrics import archive_worker
+        archive_worker(metrics_dir, worker.pid)
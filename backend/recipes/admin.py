@@ -2,9 +2,15 @@ from django.contrib.admin import ModelAdmin
 from django.contrib.admin import register
 from django.contrib.admin import TabularInline
 from django.contrib.auth.admin import UserAdmin
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.utils.safestring import mark_safe
 
+from .images import smallest_variant
 from .models import AmountIngredient, Ingredient, Recipe, Tag, User
+from .shopping_list import add_recipe_to_lists, remove_recipe_from_lists
+from .similar import schedule_update
+from .versions import bump_recipe_cart_versions
 
 
 @register(User)
@@ -67,8 +73,25 @@ class RecipeAdmin(ModelAdmin):
     inlines = (IngredientInline,)
     empty_value_display = '-пусто-'
 
+    def save_related(self, request, form, formsets, change):
+        if change:
+            remove_recipe_from_lists(form.instance.id)
+        super().save_related(request, form, formsets, change)
+        if not change or 'tags' in form.changed_data or any(
+            formset.has_changed() for formset in formsets
+        ):
+            schedule_update(form.instance.id)
+        if change:
+            recipe_id = form.instance.id
+            add_recipe_to_lists(recipe_id)
+            transaction.on_commit(
+                lambda: bump_recipe_cart_versions(recipe_id)
+            )
+
     def get_image(self, obj):
-        return mark_safe(f'<img src={obj.image.url} width="80" hieght="30"')
+        thumbnail = smallest_variant(obj.image_variants)
+        url = default_storage.url(thumbnail) if thumbnail else obj.image.url
+        return mark_safe(f'<img src={url} width="80" hieght="30"')
 
     get_image.short_description = 'Фото'
 
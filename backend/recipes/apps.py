@@ -1,7 +1,29 @@
 from django.apps import AppConfig
+from django.db.models.signals import (m2m_changed, post_delete,
+                                      post_migrate, post_save, pre_delete)
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        from .counters import recipe_deleted, recipe_saved, user_deleted
+        from .feed import recipe_published, subscriptions_changed
+        from .images import schedule_variants
+        from .search import setup_search
+        from .shopping_list import cart_changed, remove_deleted_recipe
+        recipe = self.get_model('Recipe')
+        post_migrate.connect(setup_search, sender=self)
+        post_save.connect(schedule_variants, sender=recipe)
+        post_save.connect(recipe_saved, sender=recipe)
+        post_delete.connect(recipe_deleted, sender=recipe)
+        pre_delete.connect(remove_deleted_recipe, sender=recipe)
+        pre_delete.connect(user_deleted, sender=self.get_model('User'))
+        m2m_changed.connect(cart_changed, sender=recipe.cart.through)
+        post_save.connect(recipe_published, sender=recipe)
+        m2m_changed.connect(
+            subscriptions_changed,
+            sender=self.get_model('User').subscribe.through,
+        )
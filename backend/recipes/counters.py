@@ -0,0 +1,85 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Recipe, ShoppingCart, User
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def count_subquery(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('*')).values('total')
+    ), Value(0))
+
+
+def recipe_counters():
+    return {
+        'favorites_count': count_subquery(Favorite.objects, 'recipe'),
+        'in_carts_count': count_subquery(ShoppingCart.objects, 'recipe'),
+    }
+
+
+def user_counters():
+    return {
+        'recipes_count': count_subquery(Recipe.objects, 'author'),
+        'subscribers_count': count_subquery(
+            User.subscribe.through.objects, 'to_user'
+        ),
+    }
+
+
+def rebuild_model_counters(model, counters):
+    drifted = model.objects.annotate(**{
+        f'actual_{field}': value for field, value in counters.items()
+    }).filter(reduce(or_, (
+        ~Q(**{field: F(f'actual_{field}')}) for field in counters
+    ))).values_list('id', flat=True)
+    drifted = list(drifted)
+    for start in range(0, len(drifted), REBUILD_BATCH_SIZE):
+        with transaction.atomic():
+            model.objects.filter(
+                id__in=drifted[start:start + REBUILD_BATCH_SIZE]
+            ).update(**counters)
+    return len(drifted)
+
+
+def rebuild_counters():
+    return {
+        'recipes': rebuild_model_counters(Recipe, recipe_counters()),
+        'users': rebuild_model_counters(User, user_counters()),
+    }
+
+
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        User.objects.filter(id=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+def recipe_deleted(sender, instance, **kwargs):
+    User.objects.filter(id=instance.author_id).update(
+        recipes_count=Greatest(F('recipes_count') - 1, 0)
+    )
+
+
+def user_deleted(sender, instance, **kwargs):
+    User.objects.filter(id__in=User.subscribe.through.objects.filter(
+        from_user=instance
+    ).values('to_user')).update(
+        subscribers_count=Greatest(F('subscribers_count') - 1, 0)
+    )
+    for model, counter in (
+        (Favorite, 'favorites_count'), (ShoppingCart, 'in_carts_count'),
+    ):
+        Recipe.objects.filter(
+            id__in=model.objects.filter(user=instance).values('recipe')
+        ).exclude(author=instance).update(
+            **{counter: Greatest(F(counter) - 1, 0)}
+        )
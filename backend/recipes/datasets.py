@@ -0,0 +1,150 @@
+from collections import namedtuple
+from itertools import islice
+from random import Random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from .counters import rebuild_counters
+from .feed import rebuild_feeds
+from .models import (AmountIngredient, Favorite, Ingredient, Recipe,
+                     ShoppingCart, Tag, User)
+from .shopping_list import rebuild_all_shopping_lists
+
+Scale = namedtuple('Scale', (
+    'recipes', 'users', 'ingredients', 'tags',
+    'favorites_per_user', 'carts_per_user', 'subscriptions_per_user',
+))
+
+SCALES = {
+    '1k': Scale(1_000, 200, 500, 12, 20, 5, 10),
+    '100k': Scale(100_000, 10_000, 2_000, 24, 20, 5, 10),
+    '1m': Scale(1_000_000, 50_000, 2_000, 24, 20, 5, 10),
+}
+
+WORDS = (
+    'борщ', 'суп', 'салат', 'пирог', 'каша', 'плов', 'рагу', 'омлет',
+    'блины', 'котлеты', 'паста', 'запеканка', 'соус', 'курица', 'рыба',
+    'грибы', 'сыр', 'томаты', 'картофель', 'тыква', 'яблоки', 'шоколад',
+)
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+DATASET_PASSWORD = 'benchmark-password'
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert(model, rows, batch_size):
+    for batch in batched(rows, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def distinct_sample(rng, population, count, exclude=None):
+    picked = set()
+    while len(picked) < count:
+        value = rng.randint(1, population)
+        if value != exclude:
+            picked.add(value)
+    return sorted(picked)
+
+
+def dataset_exists(scale):
+    return (
+        Recipe.objects.count() == scale.recipes
+        and User.objects.count() == scale.users
+    )
+
+
+def build_dataset(scale, seed=0, batch_size=5000):
+    rng = Random(seed)
+    password = make_password(DATASET_PASSWORD)
+
+    insert(Tag, (
+        Tag(id=i, name=f'Тег {i}', slug=f'tag-{i}', color=f'#{i:06x}')
+        for i in range(1, scale.tags + 1)
+    ), batch_size)
+    insert(Ingredient, (
+        Ingredient(
+            id=i,
+            name=f'{rng.choice(WORDS)} {i}',
+            measurement_unit=rng.choice(UNITS),
+        )
+        for i in range(1, scale.ingredients + 1)
+    ), batch_size)
+    insert(User, (
+        User(
+            id=i, username=f'user{i}', email=f'user{i}@example.com',
+            first_name=f'Имя{i}', last_name=f'Фамилия{i}', password=password,
+        )
+        for i in range(1, scale.users + 1)
+    ), batch_size)
+    insert(Recipe, (
+        Recipe(
+            id=i,
+            author_id=rng.randint(1, scale.users),
+            name=f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+            text=' '.join(rng.choice(WORDS) for _ in range(30)),
+            cooking_time=rng.randint(5, 180),
+            image=f'benchmark/{i % 100}.png',
+        )
+        for i in range(1, scale.recipes + 1)
+    ), batch_size)
+
+    insert(Recipe.tags.through, (
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in range(1, scale.recipes + 1)
+        for tag_id in distinct_sample(rng, scale.tags, rng.randint(1, 3))
+    ), batch_size)
+    insert(AmountIngredient, (
+        AmountIngredient(
+            recipe_id=recipe_id, ingredients_id=ingredient_id,
+            amount=rng.randint(1, 500),
+        )
+        for recipe_id in range(1, scale.recipes + 1)
+        for ingredient_id in distinct_sample(
+            rng, scale.ingredients, rng.randint(3, 8)
+        )
+    ), batch_size)
+    insert(Favorite, (
+        Favorite(user_id=user_id, recipe_id=recipe_id)
+        for user_id in range(1, scale.users + 1)
+        for recipe_id in distinct_sample(
+            rng, scale.recipes, scale.favorites_per_user
+        )
+    ), batch_size)
+    insert(ShoppingCart, (
+        ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+        for user_id in range(1, scale.users + 1)
+        for recipe_id in distinct_sample(
+            rng, scale.recipes, scale.carts_per_user
+        )
+    ), batch_size)
+    insert(User.subscribe.through, (
+        User.subscribe.through(from_user_id=user_id, to_user_id=author_id)
+        for user_id in range(1, scale.users + 1)
+        for author_id in distinct_sample(
+            rng, scale.users, scale.subscriptions_per_user, exclude=user_id
+        )
+    ), batch_size)
+
+    reset_sequences()
+    rebuild_counters()
+    rebuild_all_shopping_lists(batch_size)
+    rebuild_feeds()
+
+
+def reset_sequences():
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Tag, Ingredient, User, Recipe]
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,248 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import FeedEntry, Recipe, User
+
+FEED_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=FEED_WORKERS, thread_name_prefix='recipe-feed'
+)
+Subscription = User.subscribe.through
+
+
+def feed_cutoff():
+    return timezone.now() - timedelta(days=settings.FEED_RETENTION_DAYS)
+
+
+def merged_authors(user):
+    return list(user.subscribe.filter(
+        subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).order_by().values_list('id', flat=True))
+
+
+def feed_sources(user):
+    entries = FeedEntry.objects.filter(user=user)
+    authors = merged_authors(user)
+    if not authors:
+        return (entries.values('pub_date', 'recipe_id'),)
+    return (
+        entries.exclude(author__in=authors).values('pub_date', 'recipe_id'),
+        Recipe.objects.filter(
+            author__in=authors, pub_date__gte=feed_cutoff()
+        ).annotate(recipe_id=F('id')).values('pub_date', 'recipe_id'),
+    )
+
+
+def push_recipe(recipe_id):
+    recipe = Recipe.objects.filter(id=recipe_id).values(
+        'author_id', 'author__subscribers_count', 'pub_date'
+    ).first()
+    if recipe is None or (
+        recipe['author__subscribers_count'] > settings.FEED_FANOUT_LIMIT
+    ):
+        return 0
+    subscribers = Subscription.objects.filter(
+        to_user=recipe['author_id']
+    ).order_by('from_user').values_list('from_user', flat=True)
+    pushed = last = 0
+    while True:
+        batch = list(
+            subscribers.filter(from_user__gt=last)[:settings.FEED_BATCH_SIZE]
+        )
+        if not batch:
+            return pushed
+        with transaction.atomic():
+            FeedEntry.objects.bulk_create((
+                FeedEntry(
+                    user_id=user_id, recipe_id=recipe_id,
+                    author_id=recipe['author_id'], pub_date=recipe['pub_date'],
+                )
+                for user_id in batch
+            ), ignore_conflicts=True)
+        pushed += len(batch)
+        last = batch[-1]
+
+
+def refresh_recipe(recipe_id):
+    pub_date = Recipe.objects.filter(id=recipe_id).values_list(
+        'pub_date', flat=True
+    ).first()
+    if pub_date is not None:
+        FeedEntry.objects.filter(recipe_id=recipe_id).exclude(
+            pub_date=pub_date
+        ).update(pub_date=pub_date)
+
+
+def switch_author(author_id):
+    if User.objects.filter(
+        id=author_id, subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists():
+        FeedEntry.objects.filter(author=author_id).delete()
+        return
+    subscribers = Subscription.objects.filter(
+        to_user=author_id
+    ).order_by('from_user').values_list('from_user', flat=True)
+    last = 0
+    while True:
+        batch = list(
+            subscribers.filter(from_user__gt=last)[:settings.FEED_BATCH_SIZE]
+        )
+        if not batch:
+            return
+        backfill([(user_id, author_id) for user_id in batch])
+        last = batch[-1]
+
+
+def run(task, object_id):
+    try:
+        task(object_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обновить ленты: %s(%s)', task.__name__, object_id
+        )
+    finally:
+        connection.close()
+
+
+def recipe_published(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    task = push_recipe if created else refresh_recipe
+    recipe_id = instance.id
+    transaction.on_commit(lambda: executor.submit(run, task, recipe_id))
+
+
+def backfill(pairs):
+    authors = {author_id for _, author_id in pairs}
+    authors = set(User.objects.filter(
+        id__in=authors, subscribers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', flat=True))
+    if not authors:
+        return
+    recent = {author_id: [] for author_id in authors}
+    for recipe_id, author_id, pub_date in Recipe.objects.filter(
+        author__in=authors, pub_date__gte=feed_cutoff()
+    ).order_by('-pub_date', '-id').values_list('id', 'author', 'pub_date'):
+        if len(recent[author_id]) < settings.FEED_MAX_ENTRIES:
+            recent[author_id].append((recipe_id, pub_date))
+    FeedEntry.objects.bulk_create((
+        FeedEntry(
+            user_id=user_id, recipe_id=recipe_id, author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id, author_id in pairs if author_id in authors
+        for recipe_id, pub_date in recent[author_id]
+    ), batch_size=settings.FEED_BATCH_SIZE, ignore_conflicts=True)
+
+
+def switched_authors(author_ids, delta):
+    limit = settings.FEED_FANOUT_LIMIT
+    if delta > 0:
+        bounds = (limit + 1, limit + delta)
+    else:
+        bounds = (limit + delta + 1, limit)
+    return list(User.objects.filter(
+        id__in=author_ids, subscribers_count__range=bounds
+    ).values_list('id', flat=True))
+
+
+def subscriptions_changed(instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        owner = 'author' if reverse else 'user'
+        FeedEntry.objects.filter(**{owner: instance}).delete()
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    if reverse:
+        pairs = [(user_id, instance.id) for user_id in pk_set]
+        authors, delta = [instance.id], len(pk_set)
+    else:
+        pairs = [(instance.id, author_id) for author_id in pk_set]
+        authors, delta = pk_set, 1
+    if action == 'post_remove':
+        if reverse:
+            FeedEntry.objects.filter(author=instance, user__in=pk_set).delete()
+        else:
+            FeedEntry.objects.filter(user=instance, author__in=pk_set).delete()
+        delta = -delta
+    else:
+        backfill(pairs)
+    for author_id in switched_authors(authors, delta):
+        transaction.on_commit(
+            lambda author_id=author_id: executor.submit(
+                run, switch_author, author_id
+            )
+        )
+
+
+def trim_user_feed(user_id, max_entries):
+    boundary = list(FeedEntry.objects.filter(user=user_id).order_by(
+        '-pub_date', '-recipe'
+    ).values_list('pub_date', 'recipe_id')[max_entries:max_entries + 1])
+    if not boundary:
+        return 0
+    pub_date, recipe_id = boundary[0]
+    return FeedEntry.objects.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, recipe__lte=recipe_id),
+        user=user_id,
+    ).delete()[0]
+
+
+def trim_feeds(max_entries=None, batch_size=None):
+    max_entries = max_entries or settings.FEED_MAX_ENTRIES
+    batch_size = batch_size or settings.FEED_BATCH_SIZE
+    expired = FeedEntry.objects.filter(
+        pub_date__lt=feed_cutoff()
+    ).values_list('id', flat=True)
+    deleted = 0
+    while True:
+        batch = list(expired[:batch_size])
+        if not batch:
+            break
+        deleted += FeedEntry.objects.filter(id__in=batch).delete()[0]
+    overflowing = FeedEntry.objects.order_by().values('user').annotate(
+        total=Count('*')
+    ).filter(total__gt=max_entries).values_list('user', flat=True)
+    for user_id in list(overflowing):
+        with transaction.atomic():
+            deleted += trim_user_feed(user_id, max_entries)
+    return deleted
+
+
+def rebuild_feeds(batch_size=None):
+    batch_size = batch_size or settings.FEED_BATCH_SIZE
+    user_ids = list(Subscription.objects.order_by('from_user').values_list(
+        'from_user', flat=True
+    ).distinct())
+    cutoff = feed_cutoff()
+    FeedEntry.objects.exclude(user__in=Subscription.objects.values(
+        'from_user'
+    )).delete()
+    created = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        entries = [
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id, recipe_id, author_id, pub_date in
+            Recipe.objects.filter(
+                author__subscribers__in=batch,
+                author__subscribers_count__lte=settings.FEED_FANOUT_LIMIT,
+                pub_date__gte=cutoff,
+            ).values_list('author__subscribers', 'id', 'author', 'pub_date')
+        ]
+        with transaction.atomic():
+            FeedEntry.objects.filter(user__in=batch).delete()
+            FeedEntry.objects.bulk_create(entries, batch_size=batch_size)
+        created += len(entries)
+    return created, trim_feeds(batch_size=batch_size)
@@ -0,0 +1,116 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from .versions import bump_recipe_versions
+
+IMAGE_WIDTHS = (320, 640, 1280)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+IMAGE_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_WORKERS, thread_name_prefix='recipe-images'
+)
+
+
+def variant_name(name, width, extension):
+    root, _ = os.path.splitext(name)
+    return f'variants/{root}_{width}.{extension}'
+
+
+def render_variants(name):
+    with default_storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    variants = {}
+    for width in IMAGE_WIDTHS:
+        if width >= image.width and variants:
+            break
+        resized = image
+        if width < image.width:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+        formats = {}
+        for extension, (image_format, options) in IMAGE_FORMATS.items():
+            frame = resized
+            if image_format == 'JPEG' and frame.mode == 'RGBA':
+                frame = Image.new('RGB', frame.size, 'white')
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = BytesIO()
+            frame.save(buffer, image_format, **options)
+            path = variant_name(name, width, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            formats[extension] = default_storage.save(
+                path, ContentFile(buffer.getvalue())
+            )
+        variants[str(min(width, image.width))] = formats
+    return variants
+
+
+def variant_paths(image_variants):
+    return {
+        path
+        for formats in image_variants.get('widths', {}).values()
+        for path in formats.values()
+    }
+
+
+def delete_variants(image_variants, keep=None):
+    keep = variant_paths(keep or {})
+    for path in variant_paths(image_variants) - keep:
+        default_storage.delete(path)
+
+
+def build_variants(recipe_id):
+    try:
+        recipe = Recipe.objects.filter(id=recipe_id).only(
+            'image', 'image_variants'
+        ).first()
+        if recipe is None or not recipe.image:
+            return
+        name = recipe.image.name
+        variants = {'source': name, 'widths': render_variants(name)}
+        updated = Recipe.objects.filter(id=recipe_id, image=name).update(
+            image_variants=variants
+        )
+        if not updated:
+            delete_variants(variants)
+        else:
+            bump_recipe_versions(recipe_id)
+            delete_variants(recipe.image_variants, keep=variants)
+    except Exception:
+        logger.exception('Не удалось обработать фото рецепта %s', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_variants(sender, instance, **kwargs):
+    if instance.image and (
+        instance.image_variants.get('source') != instance.image.name
+    ):
+        recipe_id = instance.id
+        transaction.on_commit(
+            lambda: executor.submit(build_variants, recipe_id)
+        )
+
+
+def smallest_variant(image_variants, extension='webp'):
+    widths = image_variants.get('widths')
+    if not widths:
+        return None
+    return widths[min(widths, key=int)].get(extension)
@@ -0,0 +1,33 @@
+from time import monotonic
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.similar import METRICS, build_index, sparse
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит индекс похожих рецептов по общим ингредиентам '
+        'и тегам для /api/recipes/{id}/similar/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if settings.SIMILAR_RECIPES_METRIC not in METRICS:
+            raise CommandError(
+                f'SIMILAR_RECIPES_METRIC должна быть одной из: '
+                f'{", ".join(METRICS)}'
+            )
+        if sparse is None:
+            self.stdout.write(self.style.WARNING(
+                'numpy и scipy не установлены, индекс строится по одному '
+                'рецепту за раз - это заметно медленнее.'
+            ))
+        started = monotonic()
+        written = build_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано {written} пар за {monotonic() - started:.1f} с'
+        ))
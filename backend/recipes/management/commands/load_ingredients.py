@@ -0,0 +1,214 @@
+import csv
+import json
+import sys
+from io import StringIO
+from itertools import islice
+from time import monotonic
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Ingredient
+from recipes.versions import (INGREDIENTS_VERSION, bump_version,
+                              versions_shared)
+
+CHUNK_SIZE = 64 * 1024
+MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+
+POSTGRES_CREATE_TEMP = '''
+    CREATE TEMP TABLE ingredient_import (
+        name varchar(200), measurement_unit varchar(200)
+    ) ON COMMIT DROP
+'''
+POSTGRES_COPY = 'COPY ingredient_import FROM STDIN WITH (FORMAT csv)'
+POSTGRES_UPSERT = '''
+    INSERT INTO recipes_ingredient (name, measurement_unit)
+    SELECT name, measurement_unit FROM ingredient_import
+    ON CONFLICT (name) DO UPDATE
+    SET measurement_unit = EXCLUDED.measurement_unit
+    WHERE recipes_ingredient.measurement_unit <> EXCLUDED.measurement_unit
+    RETURNING xmax = 0
+'''
+
+
+def read_json_array(stream):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = False
+    while True:
+        buffer = buffer.lstrip()
+        if started:
+            buffer = buffer.lstrip(',').lstrip()
+        if started and buffer.startswith(']'):
+            return
+        if buffer:
+            if not started:
+                if buffer[0] != '[':
+                    raise CommandError('Ожидался JSON-массив.')
+                buffer = buffer[1:]
+                started = True
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise CommandError('Некорректный JSON.')
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            raise CommandError('Неожиданный конец файла.')
+        chunk = stream.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def read_json_lines(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    for row in csv.reader(stream):
+        if len(row) < 2 or tuple(row[:2]) == ('name', 'measurement_unit'):
+            continue
+        yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+READERS = {
+    'json': read_json_array,
+    'jsonl': read_json_lines,
+    'csv': read_csv,
+}
+
+
+def ingredient_rows(items):
+    for item in items:
+        if 'model' in item:
+            if item['model'] != 'recipes.ingredient':
+                continue
+            item = item['fields']
+        name = str(item.get('name', '')).strip()
+        measurement_unit = str(item.get('measurement_unit', '')).strip()
+        if name and len(name) <= MAX_LENGTH:
+            yield name, measurement_unit[:MAX_LENGTH]
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = dict(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из JSON, JSONL или CSV (файл или stdin), '
+        'обновляя уже существующие по названию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Путь к файлу; по умолчанию читается stdin.',
+        )
+        parser.add_argument(
+            '--format', choices=READERS, dest='file_format',
+            help='Формат входных данных; по умолчанию по расширению файла.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def detect_format(self, path, stream):
+        for file_format in READERS:
+            if path.endswith(f'.{file_format}'):
+                return file_format
+        if path == '-':
+            return 'json'
+        first = stream.read(1)
+        stream.seek(0)
+        return {'[': 'json', '{': 'jsonl'}.get(first, 'csv')
+
+    @staticmethod
+    def upsert(batch):
+        existing = {
+            name: (pk, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.filter(
+                name__in=batch
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in batch.items()
+                if name not in existing
+            ),
+            ignore_conflicts=True,
+        )
+        changed = [
+            Ingredient(id=pk, measurement_unit=batch[name])
+            for name, (pk, measurement_unit) in existing.items()
+            if measurement_unit != batch[name]
+        ]
+        Ingredient.objects.bulk_update(changed, ('measurement_unit',))
+        return len(batch) - len(existing), len(changed)
+
+    @staticmethod
+    def upsert_copy(batch):
+        buffer = StringIO()
+        csv.writer(buffer).writerows(batch.items())
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRES_CREATE_TEMP)
+            cursor.copy_expert(POSTGRES_COPY, buffer)
+            cursor.execute(POSTGRES_UPSERT)
+            inserted = [row[0] for row in cursor.fetchall()]
+        return inserted.count(True), inserted.count(False)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = (
+            sys.stdin if path == '-' else open(path, encoding='utf-8')
+        )
+        upsert = (
+            self.upsert_copy if connection.vendor == 'postgresql'
+            else self.upsert
+        )
+        file_format = (
+            options['file_format'] or self.detect_format(path, stream)
+        )
+
+        total = created = updated = 0
+        started = monotonic()
+        try:
+            rows = ingredient_rows(READERS[file_format](stream))
+            for batch in batches(rows, options['batch_size']):
+                with transaction.atomic():
+                    batch_created, batch_updated = upsert(batch)
+                total += len(batch)
+                created += batch_created
+                updated += batch_updated
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if created or updated:
+                bump_version(INGREDIENTS_VERSION)
+
+        elapsed = monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {total} строк за {elapsed:.2f} с '
+            f'({total / max(elapsed, 1e-6):.0f} строк/с): '
+            f'добавлено {created}, обновлено {updated}.'
+        ))
+        if (created or updated) and not versions_shared():
+            self.stderr.write(self.style.WARNING(
+                'Кэш по умолчанию локален для процесса, поэтому запущенные '
+                'серверы увидят изменения только через '
+                f'{settings.INGREDIENT_INDEX_TIMEOUT} с. Укажите общий кэш '
+                'в CACHE_BACKEND.'
+            ))
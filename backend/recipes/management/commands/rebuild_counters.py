@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, списков покупок, рецептов '
+        'и подписчиков.'
+    )
+
+    def handle(self, *args, **options):
+        for name, fixed in rebuild_counters().items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: исправлено {fixed}'
+            ))
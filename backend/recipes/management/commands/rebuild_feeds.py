@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок по текущим подпискам и рецептам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        created, trimmed = rebuild_feeds(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {created - trimmed}'
+        ))
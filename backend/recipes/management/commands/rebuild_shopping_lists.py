@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_all_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет агрегированные списки покупок с корзинами, '
+        'исправляет расхождения и сообщает о них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только сообщить о расхождениях, ничего не меняя.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users, missing, extra, wrong = rebuild_all_shopping_lists(
+            options['batch_size'], options['dry_run']
+        )
+        report = (
+            f'Пользователей: {users}; не хватало позиций: {missing}, '
+            f'лишних: {extra}, с неверным количеством: {wrong}.'
+        )
+        if missing or extra or wrong:
+            self.stdout.write(self.style.WARNING(report))
+        else:
+            self.stdout.write(self.style.SUCCESS(report))
@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+from time import monotonic
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from recipes.counters import rebuild_counters
+from recipes.datasets import reset_sequences
+from recipes.feed import rebuild_feeds
+from recipes.models import Ingredient, Recipe, Tag, User
+from recipes.seeding import (DISTRIBUTIONS, Plan, chunks,
+                             ensure_reference_rows, init_worker,
+                             make_ingredient, make_tag, next_id, run_chunk)
+from recipes.shopping_list import rebuild_all_shopping_lists
+from recipes.versions import (INGREDIENTS_VERSION, RECIPES_VERSION,
+                              TAGS_VERSION, bump_version, versions_shared)
+
+STAGE_ORDER = ('users', 'recipes', 'recipe_relations', 'user_relations')
+
+
+def int_range(value):
+    low, _, high = value.partition('-')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise CommandError(f'Ожидался диапазон вида 3-10, получено {value}')
+    if low < 0 or high < low:
+        raise CommandError(f'Некорректный диапазон {value}')
+    return low, high
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует большой синтетический набор пользователей, рецептов, '
+        'ингредиентов, избранного, корзин и подписок для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--tags', type=int, default=24)
+        parser.add_argument('--ingredients', type=int, default=2_000)
+        parser.add_argument('--tags-per-recipe', type=int_range,
+                            default='1-3')
+        parser.add_argument('--ingredients-per-recipe', type=int_range,
+                            default='3-10')
+        parser.add_argument('--favorites', type=int_range, default='0-40',
+                            help='Избранных рецептов на пользователя.')
+        parser.add_argument('--carts', type=int_range, default='0-10',
+                            help='Рецептов в корзине на пользователя.')
+        parser.add_argument('--subscriptions', type=int_range,
+                            default='0-20',
+                            help='Подписок на пользователя.')
+        parser.add_argument('--author-distribution', choices=DISTRIBUTIONS,
+                            default='zipf')
+        parser.add_argument('--recipe-distribution', choices=DISTRIBUTIONS,
+                            default='zipf',
+                            help='Популярность рецептов в избранном и '
+                                 'корзинах.')
+        parser.add_argument('--ingredient-distribution',
+                            choices=DISTRIBUTIONS, default='zipf')
+        parser.add_argument('--zipf-exponent', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--chunk-size', type=int, default=20_000,
+                            help='Сущностей в одной задаче процесса.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--skip-counters', action='store_true',
+                            help='Не пересчитывать счётчики и списки '
+                                 'покупок после загрузки.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт.')
+        workers = max(1, options['workers'])
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write(
+                'SQLite не поддерживает параллельную запись, '
+                'используется один процесс.'
+            )
+            workers = 1
+
+        started = monotonic()
+        batch_size = options['batch_size']
+        tag_ids, new_tags = ensure_reference_rows(
+            Tag, options['tags'], make_tag, batch_size
+        )
+        ingredient_ids, new_ingredients = ensure_reference_rows(
+            Ingredient, options['ingredients'], make_ingredient, batch_size
+        )
+        first_user, first_recipe = next_id(User), next_id(Recipe)
+        plan = Plan(
+            options, first_user, first_recipe, tag_ids, ingredient_ids
+        )
+
+        totals = {'tags': new_tags, 'ingredients': new_ingredients}
+        try:
+            for stage in STAGE_ORDER:
+                first_id, count = (
+                    (first_user, options['users'])
+                    if stage in ('users', 'user_relations')
+                    else (first_recipe, options['recipes'])
+                )
+                tasks = chunks(stage, first_id, count, options['chunk_size'])
+                self.run_stage(stage, tasks, plan, workers, totals)
+        finally:
+            reset_sequences()
+            bump_version(TAGS_VERSION)
+            bump_version(INGREDIENTS_VERSION)
+            bump_version(RECIPES_VERSION)
+
+        if not options['skip_counters']:
+            counters_started = monotonic()
+            rebuild_counters()
+            self.stdout.write(
+                f'Счётчики пересчитаны за '
+                f'{monotonic() - counters_started:.1f} с'
+            )
+            lists_started = monotonic()
+            rebuild_all_shopping_lists(batch_size)
+            self.stdout.write(
+                f'Списки покупок пересчитаны за '
+                f'{monotonic() - lists_started:.1f} с'
+            )
+            feeds_started = monotonic()
+            rebuild_feeds(batch_size)
+            self.stdout.write(
+                f'Ленты подписок собраны за '
+                f'{monotonic() - feeds_started:.1f} с'
+            )
+
+        elapsed = monotonic() - started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано {rows} строк за {elapsed:.1f} с '
+            f'({rows / max(elapsed, 1e-6):.0f} строк/с).'
+        ))
+        if not versions_shared():
+            self.stderr.write(self.style.WARNING(
+                'Кэш по умолчанию локален для процесса, поэтому запущенные '
+                'серверы не узнают о новых данных: новые теги станут '
+                'доступны в фильтрах после перезапуска или истечения '
+                'их кэша, ингредиенты - через '
+                f'{settings.INGREDIENT_INDEX_TIMEOUT} с. Укажите общий кэш '
+                'в CACHE_BACKEND.'
+            ))
+
+    def run_stage(self, stage, tasks, plan, workers, totals):
+        started = monotonic()
+        stage_rows = 0
+        if workers == 1:
+            init_worker(plan)
+            results = map(run_chunk, tasks)
+            pool = None
+        else:
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(
+                workers, initializer=init_worker, initargs=(plan,)
+            )
+            results = pool.imap_unordered(run_chunk, tasks)
+        try:
+            for _, written, _ in results:
+                for table, count in written.items():
+                    totals[table] = totals.get(table, 0) + count
+                    stage_rows += count
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        elapsed = monotonic() - started
+        self.stdout.write(
+            f'{stage}: {stage_rows} строк за {elapsed:.1f} с '
+            f'({stage_rows / max(elapsed, 1e-6):.0f} строк/с)'
+        )
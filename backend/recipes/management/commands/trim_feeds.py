@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import trim_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из лент подписок записи старше FEED_RETENTION_DAYS '
+        'и сверх FEED_MAX_ENTRIES на пользователя.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-entries', type=int)
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        deleted = trim_feeds(options['max_entries'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def through_model(name, db_table, related_name, verbose_name,
+                  verbose_name_plural):
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name=related_name, to='recipes.recipe', verbose_name='Рецепт')),
+            ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name=related_name, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+        ],
+        options={
+            'verbose_name': verbose_name,
+            'verbose_name_plural': verbose_name_plural,
+            'db_table': db_table,
+            'unique_together': {('recipe', 'user')},
+        },
+    )
+
+
+class Migration(migrations.Migration):
+    """Превращает автоматические таблицы избранного и списка покупок
+    в явные модели, не пересоздавая их: строки остаются на месте,
+    а created_at для них заполняется временем миграции."""
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                through_model(
+                    'Favorite', 'recipes_recipe_favorite', 'favorite_entries',
+                    'Избранный рецепт', 'Избранные рецепты',
+                ),
+                through_model(
+                    'ShoppingCart', 'recipes_recipe_cart', 'cart_entries',
+                    'Рецепт в списке покупок', 'Рецепты в списке покупок',
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='favorite',
+                    field=models.ManyToManyField(related_name='favorites', through='recipes.Favorite', to=settings.AUTH_USER_MODEL, verbose_name='Любимые рецепты'),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='cart',
+                    field=models.ManyToManyField(related_name='carts', through='recipes.ShoppingCart', to=settings.AUTH_USER_MODEL, verbose_name='Список покупок'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'ordering': ('-created_at',), 'verbose_name': 'Избранный рецепт', 'verbose_name_plural': 'Избранные рецепты'},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'ordering': ('-created_at',), 'verbose_name': 'Рецепт в списке покупок', 'verbose_name_plural': 'Рецепты в списке покупок'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='favorite',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='shoppingcart',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='favorite_user_recipe_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='cart_user_recipe_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='cart_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['user', '-created_at'], name='cart_user_created_idx'),
+        ),
+    ]
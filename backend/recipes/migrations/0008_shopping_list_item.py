@@ -0,0 +1,61 @@
+# Generated by Django 3.2.13 on 2026-10-18 22:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    AmountIngredient = apps.get_model('recipes', 'AmountIngredient')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    totals = AmountIngredient.objects.filter(
+        recipe__in=ShoppingCart.objects.values('recipe')
+    ).values('recipe', 'ingredients', 'amount')
+    by_recipe = {}
+    for row in totals.iterator():
+        by_recipe.setdefault(row['recipe'], []).append(
+            (row['ingredients'], row['amount'])
+        )
+    amounts = {}
+    for user_id, recipe_id in ShoppingCart.objects.values_list(
+        'user', 'recipe'
+    ).iterator():
+        for ingredient_id, amount in by_recipe.get(recipe_id, ()):
+            key = user_id, ingredient_id
+            amounts[key] = amounts.get(key, 0) + amount
+    ShoppingListItem.objects.bulk_create((
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount
+        )
+        for (user_id, ingredient_id), amount in amounts.items()
+        if amount > 0
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='shopping_list_user_ingredient_unique'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.13 on 2026-10-18 22:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+def fill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('recipes', 'User')
+    cutoff = timezone.now() - timedelta(days=settings.FEED_RETENTION_DAYS)
+    recent = {}
+    for recipe_id, author_id, pub_date in Recipe.objects.filter(
+        author__subscribers_count__lte=settings.FEED_FANOUT_LIMIT,
+        pub_date__gte=cutoff,
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'author', 'pub_date'
+    ).iterator():
+        entries = recent.setdefault(author_id, [])
+        if len(entries) < settings.FEED_MAX_ENTRIES:
+            entries.append((recipe_id, pub_date))
+    FeedEntry.objects.bulk_create((
+        FeedEntry(
+            user_id=user_id, recipe_id=recipe_id, author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id, author_id in User.subscribe.through.objects.filter(
+            to_user__in=list(recent)
+        ).values_list('from_user', 'to_user').iterator()
+        for recipe_id, pub_date in recent[author_id]
+    ), batch_size=settings.FEED_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='feed_user_recipe_unique'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,31 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Subquery, Value
+
+
+class UserQuerySet(models.QuerySet):
+
+    def with_recipes(self, user, recipes_limit=None):
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('id')[:recipes_limit]
+            ))
+        return self.annotate(
+            subscribed=Exists(User.subscribe.through.objects.filter(
+                from_user=user, to_user=OuterRef('pk')
+            )),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        ).order_by('username')
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -23,6 +48,16 @@ class User(AbstractUser):
                                  verbose_name='Фамилия',
                                  )
     is_subscribed = models.BooleanField(default=False)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
     subscribe = models.ManyToManyField(
         verbose_name='Подписка',
         related_name='subscribers',
@@ -30,6 +65,8 @@ class User(AbstractUser):
         symmetrical=False,
     )
 
+    objects = CustomUserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -38,6 +75,14 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None):
+        # Users restored from the token cache carry only id and is_active,
+        # so the first deferred access loads the rest in one query.
+        deferred = self.get_deferred_fields()
+        if fields and deferred.issuperset(fields):
+            fields = (deferred - {'password'}).union(fields)
+        super().refresh_from_db(using, fields)
+
 
 class Tag(models.Model):
     name = models.CharField(unique=True,
@@ -84,6 +129,39 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_data(self, user):
+        return self.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredient',
+                queryset=AmountIngredient.objects.select_related(
+                    'ingredients'
+                ).order_by('id'),
+            ),
+        ).with_user_flags(user)
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_subscribed=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(Recipe.favorite.through.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            )),
+            is_in_shopping_cart=Exists(Recipe.cart.through.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            )),
+            author_subscribed=Exists(User.subscribe.through.objects.filter(
+                from_user=user, to_user=OuterRef('author')
+            )),
+        )
+
+
 class Recipe(models.Model):
     tags = models.ManyToManyField(Tag,
                                   blank=True,
@@ -113,6 +191,12 @@ class Recipe(models.Model):
         blank=True,
         null=True,
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии фото',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.IntegerField(
         validators=[MinValueValidator(1)],
@@ -122,21 +206,54 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
     favorite = models.ManyToManyField(
         User,
         verbose_name='Любимые рецепты',
         related_name='favorites',
+        through='recipes.Favorite',
     )
     cart = models.ManyToManyField(
         User,
         verbose_name='Список покупок',
         related_name='carts',
+        through='recipes.ShoppingCart',
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('-pub_date', 'id'),
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('-favorites_count', 'id'),
+                name='recipe_popularity_idx',
+            ),
+        )
 
 
 class AmountIngredient(models.Model):
@@ -171,3 +288,203 @@ class AmountIngredient(models.Model):
 
     def __str__(self) -> str:
         return f'{self.amount} {self.ingredients}'
+
+
+class Favorite(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='favorite_entries',
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='favorite_entries',
+        on_delete=models.CASCADE,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Избранный рецепт'
+        verbose_name_plural = 'Избранные рецепты'
+        db_table = 'recipes_recipe_favorite'
+        ordering = ('-created_at',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='favorite_user_recipe_unique',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user_idx',
+            ),
+            models.Index(
+                fields=('user', '-created_at'),
+                name='favorite_user_created_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} -> {self.recipe}'
+
+
+class ShoppingCart(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='cart_entries',
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='cart_entries',
+        on_delete=models.CASCADE,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в списке покупок'
+        verbose_name_plural = 'Рецепты в списке покупок'
+        db_table = 'recipes_recipe_cart'
+        ordering = ('-created_at',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='cart_user_recipe_unique',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='cart_recipe_user_idx',
+            ),
+            models.Index(
+                fields=('user', '-created_at'),
+                name='cart_user_created_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} -> {self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE,
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='shopping_list_user_ingredient_unique',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.amount} {self.ingredient}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='feed_user_recipe_unique',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_user_author_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} <- {self.recipe}'
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='similar_entries',
+        on_delete=models.CASCADE,
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        verbose_name='Похожий рецепт',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='similar_recipe_unique',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score', 'similar'),
+                name='similar_recipe_score_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}: {self.score:.3f}'
@@ -0,0 +1,104 @@
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models.signals import m2m_changed
+
+Relation = namedtuple('Relation', 'through source target counter reverse')
+
+
+def can_return_rows():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def relation_columns(relation):
+    meta = relation.through._meta
+    source = meta.get_field(relation.source)
+    target = meta.get_field(relation.target)
+    return meta, source, target
+
+
+def existing_targets(relation, source_id, target_ids):
+    return set(relation.through.objects.filter(**{
+        relation.source: source_id, f'{relation.target}__in': target_ids,
+    }).values_list(f'{relation.target}_id', flat=True))
+
+
+def add_relations(relation, source_id, target_ids):
+    if not target_ids:
+        return []
+    meta, source, target = relation_columns(relation)
+    target_meta = target.related_model._meta
+    extra = [
+        field for field in meta.concrete_fields
+        if field not in (meta.pk, source, target)
+    ]
+    blank = relation.through()
+    extra_values = [
+        field.get_db_prep_save(field.pre_save(blank, True), connection)
+        for field in extra
+    ]
+    quote = connection.ops.quote_name
+    returning = can_return_rows()
+    existing = set() if returning else existing_targets(
+        relation, source_id, target_ids
+    )
+
+    columns = ', '.join(
+        quote(field.column) for field in [source, target] + extra
+    )
+    target_pk = quote(target_meta.pk.column)
+    select = ', '.join(['%s', target_pk] + ['%s'] * len(extra))
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    sql = (
+        f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote(meta.db_table)} ({columns}) '
+        f'SELECT {select} FROM {quote(target_meta.db_table)} '
+        f'WHERE {target_pk} IN ({placeholders}) '
+        f'{connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    if returning:
+        sql += f' RETURNING {quote(target.column)}'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [source_id, *extra_values, *target_ids])
+        if returning:
+            return sorted(row[0] for row in cursor.fetchall())
+    return sorted(existing_targets(relation, source_id, target_ids) - existing)
+
+
+def remove_relations(relation, source_id, target_ids):
+    if not target_ids:
+        return []
+    meta, source, target = relation_columns(relation)
+    if not can_return_rows():
+        removed = existing_targets(relation, source_id, target_ids)
+        relation.through.objects.filter(**{
+            relation.source: source_id, f'{relation.target}__in': removed,
+        }).delete()
+        return sorted(removed)
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(source.column)} = %s '
+            f'AND {quote(target.column)} IN ({placeholders}) '
+            f'RETURNING {quote(target.column)}',
+            [source_id, *target_ids],
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def relations_changed(relation, instance, action, target_ids):
+    if target_ids:
+        m2m_changed.send(
+            sender=relation.through, instance=instance, action=action,
+            reverse=relation.reverse,
+            model=relation.through._meta.get_field(
+                relation.target
+            ).related_model,
+            pk_set=set(target_ids), using=connection.alias,
+        )
@@ -0,0 +1,269 @@
+from bisect import bisect
+from io import StringIO
+from itertools import accumulate
+from random import Random
+from time import monotonic
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from .datasets import UNITS, WORDS, batched, distinct_sample
+from .models import (AmountIngredient, Favorite, Ingredient, Recipe,
+                     ShoppingCart, Tag, User)
+
+SEED_PASSWORD = 'seed-password'
+DISTRIBUTIONS = ('uniform', 'zipf')
+MAX_DRAWS_PER_ITEM = 50
+
+plan = None
+
+
+class Sampler:
+
+    def __init__(self, first_id, count, distribution='uniform', exponent=1.1):
+        self.first_id = first_id
+        self.count = count
+        self.cum_weights = None
+        if distribution == 'zipf':
+            self.cum_weights = list(accumulate(
+                1 / rank ** exponent for rank in range(1, count + 1)
+            ))
+
+    def __call__(self, rng):
+        if self.cum_weights is None:
+            return self.first_id + rng.randrange(self.count)
+        offset = bisect(self.cum_weights, rng.random() * self.cum_weights[-1])
+        return self.first_id + min(offset, self.count - 1)
+
+    def sample(self, rng, size, exclude=None):
+        size = min(size, self.count - (exclude is not None))
+        picked = set()
+        for _ in range(size * MAX_DRAWS_PER_ITEM):
+            if len(picked) >= size:
+                break
+            value = self(rng)
+            if value != exclude:
+                picked.add(value)
+        return sorted(picked)
+
+
+class Plan:
+
+    def __init__(self, options, first_user, first_recipe, tag_ids,
+                 ingredient_ids):
+        self.options = options
+        self.first_user = first_user
+        self.first_recipe = first_recipe
+        self.tag_ids = tag_ids
+        self.ingredient_ids = ingredient_ids
+        self.password = make_password(SEED_PASSWORD)
+        self.authors = Sampler(
+            first_user, options['users'], options['author_distribution'],
+            options['zipf_exponent'],
+        )
+        self.popular_recipes = Sampler(
+            first_recipe, options['recipes'],
+            options['recipe_distribution'], options['zipf_exponent'],
+        )
+        self.ingredients = Sampler(
+            0, len(ingredient_ids), options['ingredient_distribution'],
+            options['zipf_exponent'],
+        )
+
+    def rng(self, stage, start):
+        return Random(f'{self.options["seed"]}:{stage}:{start}')
+
+    def randint(self, rng, name):
+        low, high = self.options[name]
+        return rng.randint(low, high)
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n'
+    ).replace('\r', '\\r')
+
+
+def copy_objects(model, objs):
+    fields = model._meta.concrete_fields
+    buffer = StringIO()
+    for obj in objs:
+        buffer.write('\t'.join(
+            copy_value(field.get_db_prep_save(
+                field.pre_save(obj, True), connection
+            ))
+            for field in fields
+        ))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+
+
+def write(model, objs, batch_size):
+    written = 0
+    for batch in batched(objs, batch_size):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                copy_objects(model, batch)
+            else:
+                model.objects.bulk_create(batch, batch_size=batch_size)
+        written += len(batch)
+    return written
+
+
+def seed_users(start, stop):
+    return {User: (
+        User(
+            id=user_id, username=f'seed{user_id}',
+            email=f'seed{user_id}@example.com', first_name=f'Имя{user_id}',
+            last_name=f'Фамилия{user_id}', password=plan.password,
+        )
+        for user_id in range(start, stop)
+    )}
+
+
+def seed_recipes(start, stop):
+    rng = plan.rng('recipes', start)
+    return {Recipe: (
+        Recipe(
+            id=recipe_id,
+            author_id=plan.authors(rng),
+            name=f'{rng.choice(WORDS)} {rng.choice(WORDS)} {recipe_id}',
+            text=' '.join(rng.choice(WORDS) for _ in range(30)),
+            cooking_time=rng.randint(5, 180),
+        )
+        for recipe_id in range(start, stop)
+    )}
+
+
+def seed_recipe_relations(start, stop):
+    tags_rng = plan.rng('recipe-tags', start)
+    ingredients_rng = plan.rng('recipe-ingredients', start)
+    tag_ids = plan.tag_ids
+    ingredient_ids = plan.ingredient_ids
+    return {
+        Recipe.tags.through: (
+            Recipe.tags.through(
+                recipe_id=recipe_id, tag_id=tag_ids[index - 1]
+            )
+            for recipe_id in range(start, stop)
+            for index in distinct_sample(
+                tags_rng, len(tag_ids),
+                min(len(tag_ids), plan.randint(tags_rng, 'tags_per_recipe')),
+            )
+        ),
+        AmountIngredient: (
+            AmountIngredient(
+                recipe_id=recipe_id,
+                ingredients_id=ingredient_ids[index],
+                amount=ingredients_rng.randint(1, 500),
+            )
+            for recipe_id in range(start, stop)
+            for index in plan.ingredients.sample(
+                ingredients_rng,
+                plan.randint(ingredients_rng, 'ingredients_per_recipe'),
+            )
+        ),
+    }
+
+
+def seed_user_relations(start, stop):
+    favorites_rng = plan.rng('favorites', start)
+    carts_rng = plan.rng('carts', start)
+    subscriptions_rng = plan.rng('subscriptions', start)
+    return {
+        Favorite: (
+            Favorite(user_id=user_id, recipe_id=recipe_id)
+            for user_id in range(start, stop)
+            for recipe_id in plan.popular_recipes.sample(
+                favorites_rng, plan.randint(favorites_rng, 'favorites')
+            )
+        ),
+        ShoppingCart: (
+            ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+            for user_id in range(start, stop)
+            for recipe_id in plan.popular_recipes.sample(
+                carts_rng, plan.randint(carts_rng, 'carts')
+            )
+        ),
+        User.subscribe.through: (
+            User.subscribe.through(from_user_id=user_id, to_user_id=author_id)
+            for user_id in range(start, stop)
+            for author_id in plan.authors.sample(
+                subscriptions_rng,
+                plan.randint(subscriptions_rng, 'subscriptions'),
+                exclude=user_id,
+            )
+        ),
+    }
+
+
+STAGES = {
+    'users': seed_users,
+    'recipes': seed_recipes,
+    'recipe_relations': seed_recipe_relations,
+    'user_relations': seed_user_relations,
+}
+
+
+def init_worker(worker_plan):
+    global plan
+    plan = worker_plan
+    connection.close()
+
+
+def run_chunk(task):
+    stage, start, stop = task
+    started = monotonic()
+    written = {
+        model._meta.db_table: write(
+            model, objs, plan.options['batch_size']
+        )
+        for model, objs in STAGES[stage](start, stop).items()
+    }
+    return stage, written, monotonic() - started
+
+
+def ensure_reference_rows(model, count, make, batch_size):
+    ids = list(model.objects.order_by('id').values_list('id', flat=True))
+    missing = count - len(ids)
+    if missing <= 0:
+        return ids[:count], 0
+    first_id = (ids[-1] if ids else 0) + 1
+    new_ids = range(first_id, first_id + missing)
+    rng = Random(f'{model._meta.model_name}:{first_id}')
+    write(model, (make(rng, new_id) for new_id in new_ids), batch_size)
+    return ids + list(new_ids), missing
+
+
+def make_tag(rng, tag_id):
+    return Tag(
+        id=tag_id, name=f'seed-tag-{tag_id}', slug=f'seed-tag-{tag_id}',
+        color=f'#{tag_id:06x}',
+    )
+
+
+def make_ingredient(rng, ingredient_id):
+    return Ingredient(
+        id=ingredient_id, name=f'{rng.choice(WORDS)} {ingredient_id}',
+        measurement_unit=rng.choice(UNITS),
+    )
+
+
+def next_id(model):
+    last = model.objects.order_by('-id').values_list('id', flat=True).first()
+    return (last or 0) + 1
+
+
+def chunks(stage, first_id, count, size):
+    return [
+        (stage, start, min(start + size, first_id + count))
+        for start in range(first_id, first_id + count, size)
+    ]
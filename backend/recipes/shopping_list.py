@@ -0,0 +1,145 @@
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import AmountIngredient, ShoppingCart, ShoppingListItem
+
+LIST_TABLE = ShoppingListItem._meta.db_table
+AMOUNT_TABLE = AmountIngredient._meta.db_table
+CART_TABLE = ShoppingCart._meta.db_table
+
+UPSERT = f'''
+    INSERT INTO {LIST_TABLE} (user_id, ingredient_id, amount)
+    {{select}}
+    ON CONFLICT (user_id, ingredient_id)
+    DO UPDATE SET amount = {LIST_TABLE}.amount + excluded.amount
+'''
+USER_RECIPES = f'''
+    SELECT %s, ingredients_id, %s * SUM(amount) FROM {AMOUNT_TABLE}
+    WHERE recipe_id IN ({{recipes}})
+    GROUP BY ingredients_id
+'''
+RECIPE_USERS = f'''
+    SELECT cart.user_id, amount.ingredients_id, %s * amount.amount
+    FROM {CART_TABLE} cart
+    JOIN {AMOUNT_TABLE} amount ON amount.recipe_id = cart.recipe_id
+    WHERE cart.recipe_id = %s
+'''
+DELETE_EMPTY_FOR_USER = f'''
+    DELETE FROM {LIST_TABLE} WHERE user_id = %s AND amount <= 0
+'''
+DELETE_EMPTY_FOR_RECIPE = f'''
+    DELETE FROM {LIST_TABLE} WHERE amount <= 0 AND user_id IN (
+        SELECT user_id FROM {CART_TABLE} WHERE recipe_id = %s
+    )
+'''
+
+
+def apply_user_recipes(user_id, recipe_ids, sign):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    select = USER_RECIPES.format(recipes=', '.join(['%s'] * len(recipe_ids)))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(select=select), [user_id, sign, *recipe_ids]
+        )
+        if sign < 0:
+            cursor.execute(DELETE_EMPTY_FOR_USER, [user_id])
+
+
+def apply_recipe_users(recipe_id, sign):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(select=RECIPE_USERS), [sign, recipe_id]
+        )
+        if sign < 0:
+            cursor.execute(DELETE_EMPTY_FOR_RECIPE, [recipe_id])
+
+
+def add_recipe_to_lists(recipe_id):
+    apply_recipe_users(recipe_id, 1)
+
+
+def remove_recipe_from_lists(recipe_id):
+    apply_recipe_users(recipe_id, -1)
+
+
+def cart_changed(instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            ShoppingListItem.objects.filter(user=instance).delete()
+        else:
+            remove_recipe_from_lists(instance.id)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        apply_user_recipes(instance.id, pk_set, sign)
+    else:
+        for user_id in pk_set:
+            apply_user_recipes(user_id, (instance.id,), sign)
+
+
+def remove_deleted_recipe(sender, instance, **kwargs):
+    remove_recipe_from_lists(instance.id)
+
+
+def expected_totals(user_ids):
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in AmountIngredient.objects.filter(
+            recipe__cart_entries__user__in=user_ids
+        ).order_by().values_list(
+            'recipe__cart_entries__user', 'ingredients'
+        ).annotate(total=Sum('amount')).values_list(
+            'recipe__cart_entries__user', 'ingredients', 'total'
+        )
+        if total
+    }
+
+
+def rebuild_shopping_lists(user_ids, dry_run=False):
+    expected = expected_totals(user_ids)
+    actual = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(user__in=user_ids)
+    }
+    missing = [
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=total
+        )
+        for (user_id, ingredient_id), total in expected.items()
+        if (user_id, ingredient_id) not in actual
+    ]
+    extra = [
+        item.id for key, item in actual.items() if key not in expected
+    ]
+    wrong = []
+    for key, item in actual.items():
+        if key in expected and item.amount != expected[key]:
+            item.amount = expected[key]
+            wrong.append(item)
+    if not dry_run:
+        ShoppingListItem.objects.bulk_create(missing)
+        ShoppingListItem.objects.filter(id__in=extra).delete()
+        ShoppingListItem.objects.bulk_update(wrong, ('amount',))
+    return len(missing), len(extra), len(wrong)
+
+
+def rebuild_all_shopping_lists(batch_size=1000, dry_run=False):
+    user_ids = sorted(
+        set(ShoppingCart.objects.values_list('user_id', flat=True))
+        | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+    )
+    missing = extra = wrong = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            batch_missing, batch_extra, batch_wrong = (
+                rebuild_shopping_lists(batch, dry_run)
+            )
+        missing += batch_missing
+        extra += batch_extra
+        wrong += batch_wrong
+    return len(user_ids), missing, extra, wrong
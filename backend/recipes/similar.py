@@ -0,0 +1,281 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from heapq import nlargest
+from itertools import chain
+from math import sqrt
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from .models import AmountIngredient, Recipe, SimilarRecipe
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+METRICS = ('cosine', 'jaccard')
+SIMILAR_WORKERS = 1
+REVERSE_FANOUT = 4
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=SIMILAR_WORKERS, thread_name_prefix='recipe-similar'
+)
+pending = set()
+pending_lock = Lock()
+RecipeTag = Recipe.tags.through
+
+
+def tag_contribution():
+    weight = settings.SIMILAR_RECIPES_TAG_WEIGHT
+    if settings.SIMILAR_RECIPES_METRIC == 'cosine':
+        return weight * weight
+    return weight
+
+
+def similarity(shared, size, other_size):
+    if settings.SIMILAR_RECIPES_METRIC == 'jaccard':
+        return shared / (size + other_size - shared)
+    return shared / sqrt(size * other_size)
+
+
+def top_similar(scores, top):
+    return nlargest(top, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def grouped_counts(queryset, field):
+    return dict(queryset.order_by().values(field).annotate(
+        total=Count('*')
+    ).values_list(field, 'total'))
+
+
+def recipe_scores(recipe_id):
+    ingredients = AmountIngredient.objects.filter(
+        recipe=recipe_id
+    ).values('ingredients')
+    neighbours = AmountIngredient.objects.filter(
+        ingredients__in=ingredients
+    ).exclude(recipe=recipe_id)
+    shared = grouped_counts(neighbours, 'recipe')
+    if not shared:
+        return {}
+    candidates = neighbours.values('recipe')
+    sizes = grouped_counts(
+        AmountIngredient.objects.filter(recipe__in=candidates), 'recipe'
+    )
+    size = AmountIngredient.objects.filter(recipe=recipe_id).count()
+    weight = tag_contribution()
+    if weight:
+        tags = RecipeTag.objects.filter(recipe=recipe_id).values('tag')
+        size += weight * tags.count()
+        for candidate, total in grouped_counts(
+            RecipeTag.objects.filter(recipe__in=candidates), 'recipe'
+        ).items():
+            sizes[candidate] += weight * total
+        for candidate, total in grouped_counts(
+            RecipeTag.objects.filter(recipe__in=candidates, tag__in=tags),
+            'recipe',
+        ).items():
+            shared[candidate] += weight * total
+    return {
+        candidate: similarity(value, size, sizes[candidate])
+        for candidate, value in shared.items()
+    }
+
+
+def update_recipe(recipe_id):
+    top = settings.SIMILAR_RECIPES_TOP
+    scores = recipe_scores(recipe_id)
+    entries = [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=candidate, score=score)
+        for candidate, score in top_similar(scores, top)
+    ]
+    reverse = top_similar(scores, top * REVERSE_FANOUT)
+    current = {}
+    for owner, similar_id, score, entry_id in SimilarRecipe.objects.filter(
+        recipe__in=[candidate for candidate, _ in reverse]
+    ).exclude(similar=recipe_id).values_list(
+        'recipe', 'similar', 'score', 'id'
+    ):
+        current.setdefault(owner, []).append((score, -similar_id, entry_id))
+    displaced = []
+    replaced = []
+    for candidate, score in reverse:
+        kept = sorted(current.get(candidate, ()), reverse=True)
+        if len(kept) >= top:
+            if (score, -recipe_id) <= kept[top - 1][:2]:
+                continue
+            displaced.extend(entry_id for *_, entry_id in kept[top - 1:])
+        replaced.append(candidate)
+        entries.append(SimilarRecipe(
+            recipe_id=candidate, similar_id=recipe_id, score=score
+        ))
+    stale = set(SimilarRecipe.objects.filter(similar=recipe_id).exclude(
+        recipe__in=replaced
+    ).values_list('recipe', flat=True))
+    entries.extend(
+        SimilarRecipe(recipe_id=owner, similar_id=candidate, score=score)
+        for owner in stale
+        for candidate, score in top_similar(recipe_scores(owner), top)
+    )
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            Q(recipe=recipe_id) | Q(recipe__in=stale) | Q(id__in=displaced)
+            | Q(recipe__in=replaced, similar=recipe_id)
+        ).delete()
+        SimilarRecipe.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def run_update(recipe_id):
+    with pending_lock:
+        pending.discard(recipe_id)
+    try:
+        update_recipe(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обновить похожие рецепты %s', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_update(recipe_id):
+    if not settings.SIMILAR_RECIPES_LIVE_UPDATES:
+        return
+
+    def submit():
+        with pending_lock:
+            if recipe_id in pending:
+                return
+            pending.add(recipe_id)
+        executor.submit(run_update, recipe_id)
+
+    transaction.on_commit(submit)
+
+
+def replace_entries(recipe_ids, entries, batch_size):
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(entries, batch_size=batch_size)
+    return len(entries)
+
+
+def build_index_per_recipe(batch_size):
+    top = settings.SIMILAR_RECIPES_TOP
+    recipe_ids = list(Recipe.objects.order_by('id').values_list(
+        'id', flat=True
+    ))
+    written = 0
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        written += replace_entries(batch, [
+            SimilarRecipe(recipe_id=recipe_id, similar_id=candidate,
+                          score=score)
+            for recipe_id in batch
+            for candidate, score in top_similar(
+                recipe_scores(recipe_id), top
+            )
+        ], batch_size)
+    return written
+
+
+def pairs_array(queryset):
+    return numpy.fromiter(
+        chain.from_iterable(queryset.order_by().iterator()),
+        dtype=numpy.int64,
+    ).reshape(-1, 2)
+
+
+def load_matrices():
+    recipe_ids = numpy.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True).iterator(),
+        dtype=numpy.int64,
+    )
+    count = len(recipe_ids)
+    pairs = pairs_array(
+        AmountIngredient.objects.values_list('recipe', 'ingredients')
+    )
+    rows = numpy.searchsorted(recipe_ids, pairs[:, 0])
+    columns = numpy.unique(pairs[:, 1], return_inverse=True)[1]
+    ingredients = sparse.csr_matrix(
+        (numpy.ones(len(rows)), (rows, columns)),
+        shape=(count, columns.max() + 1 if len(columns) else 0),
+    )
+    pairs = pairs_array(RecipeTag.objects.values_list('recipe', 'tag'))
+    rows = numpy.searchsorted(recipe_ids, pairs[:, 0])
+    columns = numpy.unique(pairs[:, 1], return_inverse=True)[1]
+    tags = numpy.zeros(
+        (count, (columns.max() + 8) // 8 if len(columns) else 0),
+        dtype=numpy.uint8,
+    )
+    numpy.bitwise_or.at(
+        tags, (rows, columns // 8),
+        numpy.left_shift(1, 7 - columns % 8).astype(numpy.uint8),
+    )
+    tag_counts = numpy.bincount(rows, minlength=count)
+    return recipe_ids, ingredients, tags, tag_counts
+
+
+def build_index_sparse(batch_size):
+    top = settings.SIMILAR_RECIPES_TOP
+    weight = tag_contribution()
+    jaccard = settings.SIMILAR_RECIPES_METRIC == 'jaccard'
+    popcount = numpy.array(
+        [bin(value).count('1') for value in range(256)], dtype=numpy.float64
+    )
+    recipe_ids, ingredients, tags, tag_counts = load_matrices()
+    sizes = ingredients.getnnz(axis=1) + weight * tag_counts
+    transposed = ingredients.T.tocsr()
+    written = 0
+    for start in range(0, len(recipe_ids), batch_size):
+        stop = min(start + batch_size, len(recipe_ids))
+        shared = (ingredients[start:stop] @ transposed).tocsr()
+        rows = numpy.repeat(
+            numpy.arange(start, stop), numpy.diff(shared.indptr)
+        )
+        columns = shared.indices
+        values = shared.data
+        if weight:
+            values = values + weight * popcount[
+                tags[rows] & tags[columns]
+            ].sum(axis=1)
+        if jaccard:
+            scores = values / (sizes[rows] + sizes[columns] - values)
+        else:
+            scores = values / numpy.sqrt(sizes[rows] * sizes[columns])
+        entries = []
+        for offset, row in enumerate(range(start, stop)):
+            window = slice(shared.indptr[offset], shared.indptr[offset + 1])
+            row_columns = columns[window]
+            row_scores = scores[window]
+            keep = row_columns != row
+            row_columns, row_scores = row_columns[keep], row_scores[keep]
+            if len(row_scores) > top:
+                threshold = numpy.partition(
+                    row_scores, len(row_scores) - top
+                )[len(row_scores) - top]
+                keep = row_scores >= threshold
+                row_columns, row_scores = row_columns[keep], row_scores[keep]
+            similar_ids = recipe_ids[row_columns]
+            order = numpy.lexsort((similar_ids, -row_scores))[:top]
+            entries.extend(
+                SimilarRecipe(
+                    recipe_id=int(recipe_ids[row]),
+                    similar_id=int(similar_ids[index]),
+                    score=float(row_scores[index]),
+                )
+                for index in order
+            )
+        written += replace_entries(
+            recipe_ids[start:stop].tolist(), entries, batch_size
+        )
+    return written
+
+
+def build_index(batch_size=500):
+    if sparse is None:
+        return build_index_per_recipe(batch_size)
+    return build_index_sparse(batch_size)
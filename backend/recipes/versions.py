@@ -0,0 +1,68 @@
+from time import time_ns
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+from backend.cache import is_shared_cache
+from .models import User
+
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+RECIPES_VERSION = 'recipes'
+POPULARITY_VERSION = 'popularity'
+TOKENS_VERSION = 'tokens'
+
+
+def cart_version_name(user_id):
+    return f'cart:{user_id}'
+
+
+def recipe_version_name(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def author_version_name(user_id):
+    return f'author:{user_id}'
+
+
+def versions_shared():
+    return is_shared_cache(DEFAULT_CACHE_ALIAS)
+
+
+def get_version(name):
+    return cache.get_or_set(f'version:{name}', time_ns, timeout=None)
+
+
+def get_versions(names):
+    keys = [f'version:{name}' for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_version(name):
+    key = f'version:{name}'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time_ns()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_recipe_versions(recipe_id):
+    bump_version(recipe_version_name(recipe_id))
+    bump_version(RECIPES_VERSION)
+
+
+def bump_cart_versions(user_ids):
+    for user_id in user_ids:
+        bump_version(cart_version_name(user_id))
+
+
+def bump_recipe_cart_versions(recipe_id):
+    bump_cart_versions(
+        User.objects.filter(carts=recipe_id).values_list('id', flat=True)
+    )
@@ -0,0 +1,93 @@
+from itertools import count
+
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag, User
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def make_user(db):
+    numbers = count(1)
+
+    def make(**fields):
+        number = next(numbers)
+        return User.objects.create_user(**{
+            'username': f'user{number}',
+            'email': f'user{number}@example.com',
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': 'password',
+            **fields,
+        })
+
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name='Завтрак', color='E26C2D', slug='breakfast'),
+        Tag.objects.create(name='Обед', color='49B64E', slug='lunch'),
+        Tag.objects.create(name='Ужин', color='8775D2', slug='dinner'),
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ('мука', 'г'), ('молоко', 'мл'), ('яйца', 'шт'), ('сахар', 'г'),
+        )
+    ]
+
+
+@pytest.fixture
+def make_recipe(user):
+    numbers = count(1)
+
+    def make(author=None, tags=(), ingredients=(), **fields):
+        number = next(numbers)
+        recipe = Recipe.objects.create(**{
+            'author': author or user,
+            'name': f'Рецепт {number}',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': f'recipe{number}.png',
+            **fields,
+        })
+        recipe.tags.set(tags)
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=recipe, ingredients=ingredient,
+                             amount=amount)
+            for ingredient, amount in ingredients
+        )
+        return recipe
+
+    return make
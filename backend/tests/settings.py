@@ -0,0 +1,37 @@
+import os
+from tempfile import mkdtemp
+
+from backend.settings import *  # noqa: F401,F403
+
+SECRET_KEY = 'test'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'TEST': {'NAME': os.path.join(mkdtemp(), 'replica.sqlite3')},
+    },
+}
+# Reads go to replica1 only in tests that enable it.
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': mkdtemp(prefix='foodgram-cache-'),
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': mkdtemp(prefix='foodgram-responses-'),
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MEDIA_ROOT = mkdtemp(prefix='foodgram-media-')
+
+SIMILAR_RECIPES_LIVE_UPDATES = False
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_started
+from django.db import close_old_connections
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+def asgi_get(path, query_string='', **headers):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await ASGIHandler()({
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': query_string.encode(),
+            'server': ('testserver', 80),
+            'headers': [
+                (name.encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }, receive, send)
+
+    request_started.disconnect(close_old_connections)
+    try:
+        async_to_sync(run)()
+    finally:
+        request_started.connect(close_old_connections)
+    return messages[0]['status'], b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+
+
+@pytest.fixture
+def recipe(user, make_recipe, tags, ingredients):
+    flour, milk, *_ = ingredients
+    recipe = make_recipe(tags=tags[:2], ingredients=[(flour, 200), (milk, 1)])
+    user.favorites.add(recipe)
+    return recipe
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path, query_string', (
+    ('/api/tags/', ''),
+    ('/api/ingredients/', 'name=му'),
+    ('/api/recipes/', ''),
+    ('/api/recipes/', 'is_favorited=1&limit=1'),
+    ('/api/recipes/{id}/', ''),
+))
+def test_read_endpoints_under_asgi(user, recipe, path, query_string):
+    path = path.format(id=recipe.id)
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    expected = client.get(f'{path}?{query_string}')
+    status, content = asgi_get(
+        path, query_string, authorization=f'Token {token.key}',
+    )
+    assert status == expected.status_code == 200
+    assert json.loads(content) == expected.json()
+
+
+@pytest.mark.django_db
+def test_missing_recipe_under_asgi(recipe):
+    status, _ = asgi_get(f'/api/recipes/{recipe.id + 1}/')
+    assert status == 404
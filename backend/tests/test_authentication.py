@@ -0,0 +1,94 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from recipes.models import User
+from recipes.versions import TOKENS_VERSION, bump_version
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def me(client):
+    return client.get('/api/users/me/')
+
+
+def auth_queries(client, path='/api/users/me/'):
+    with CaptureQueriesContext(connection) as context:
+        assert client.get(path).status_code == 200
+    return [
+        query for query in context.captured_queries
+        if Token._meta.db_table in query['sql']
+        or f'FROM "{User._meta.db_table}"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+def test_token_lookup_is_cached(user, token, token_client):
+    assert auth_queries(token_client)
+    assert not auth_queries(token_client, '/api/recipes/')
+    assert len(auth_queries(token_client)) == 1
+    data = me(token_client).json()
+    assert (data['id'], data['email']) == (user.id, user.email)
+
+
+@pytest.mark.django_db
+def test_shared_cache_keeps_only_ids(user, token, token_client):
+    me(token_client)
+    assert caches['default'].get(token_cache.shared_key(token.key)) == (
+        user.id, True,
+    )
+
+
+@pytest.mark.django_db
+def test_deleted_token_is_rejected(token, token_client):
+    me(token_client)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        token.delete()
+    assert me(token_client).status_code == 401
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected(user, token_client):
+    me(token_client)
+    user.is_active = False
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        user.save()
+    assert me(token_client).status_code == 401
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCAL_CACHES)
+def test_local_tier_works_with_process_local_cache(token, token_client):
+    assert auth_queries(token_client)
+    assert caches['default'].get(token_cache.shared_key(token.key)) is None
+    assert not auth_queries(token_client, '/api/recipes/')
+
+
+@pytest.mark.django_db
+def test_generation_bump_drops_local_entries(token, token_client):
+    assert auth_queries(token_client, '/api/recipes/')
+    caches['default'].delete(token_cache.shared_key(token.key))
+    assert not auth_queries(token_client, '/api/recipes/')
+    bump_version(TOKENS_VERSION)
+    assert auth_queries(token_client, '/api/recipes/')
@@ -0,0 +1,77 @@
+import pytest
+from django.test import TestCase, override_settings
+
+from recipes.versions import TAGS_VERSION, bump_version
+from recipes.models import Tag
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+def slugs(response):
+    return [tag['slug'] for tag in response.json()]
+
+
+@pytest.mark.django_db
+def test_matching_etag_returns_not_modified(api_client, tags):
+    response = api_client.get('/api/tags/')
+    assert response.status_code == 200
+    assert 'must-revalidate' in response['Cache-Control']
+    cached = api_client.get('/api/tags/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == 304
+    assert cached['ETag'] == response['ETag']
+
+
+@pytest.mark.django_db
+def test_etag_and_body_change_after_tag_is_saved(api_client, tags):
+    response = api_client.get('/api/tags/')
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        Tag.objects.create(name='Десерт', color='FFFFFF', slug='dessert')
+    changed = api_client.get(
+        '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert changed.status_code == 200
+    assert changed['ETag'] != response['ETag']
+    assert 'dessert' in slugs(changed)
+
+
+@pytest.mark.django_db
+def test_version_bumped_by_another_process_drops_rendered_body(
+    api_client, tags
+):
+    response = api_client.get('/api/tags/')
+    Tag.objects.bulk_create(
+        [Tag(name='Десерт', color='FFFFFF', slug='dessert')]
+    )
+    assert slugs(api_client.get('/api/tags/')) == slugs(response)
+    bump_version(TAGS_VERSION)
+    assert 'dessert' in slugs(api_client.get('/api/tags/'))
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCAL_CACHES)
+def test_process_local_versions_fall_back_to_body_etag(api_client, tags):
+    response = api_client.get('/api/tags/')
+    cached = api_client.get('/api/tags/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == 304
+    Tag.objects.bulk_create(
+        [Tag(name='Десерт', color='FFFFFF', slug='dessert')]
+    )
+    changed = api_client.get(
+        '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert changed.status_code == 200
+    assert 'dessert' in slugs(changed)
+
+
+@pytest.mark.django_db
+def test_ingredient_list_is_conditional(api_client, ingredients):
+    response = api_client.get('/api/ingredients/?name=мо')
+    assert [row['name'] for row in response.json()] == ['молоко']
+    cached = api_client.get(
+        '/api/ingredients/?name=мо', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert cached.status_code == 304
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from psycopg2 import extensions
+
+from backend.db.postgresql import base
+
+
+class FakeConnection:
+    info = SimpleNamespace(
+        transaction_status=extensions.TRANSACTION_STATUS_IDLE
+    )
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.pings = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql):
+        self.pings += 1
+        if not self.alive:
+            raise base.Database.OperationalError('server closed')
+
+    def close(self):
+        self.closed = True
+
+
+def test_recently_released_connection_is_not_pinged():
+    pool = base.ConnectionPool(FakeConnection, 1, 1, 600)
+    connection = pool.acquire()
+    pool.release(connection)
+    assert pool.acquire() is connection
+    assert connection.pings == 0
+
+
+def test_long_idle_connection_is_pinged_and_replaced(monkeypatch):
+    pool = base.ConnectionPool(FakeConnection, 1, 1, 600)
+    connection = pool.acquire()
+    pool.release(connection)
+    monkeypatch.setattr(base, 'PING_IDLE_SECONDS', 0)
+    assert pool.acquire() is connection
+    assert connection.pings == 1
+
+    connection.alive = False
+    pool.release(connection)
+    replacement = pool.acquire()
+    assert replacement is not connection
+    assert connection.closed
@@ -0,0 +1,109 @@
+import pytest
+
+from recipes.counters import rebuild_counters
+from recipes.models import Recipe, User
+
+
+def counters(recipe):
+    return Recipe.objects.values_list(
+        'favorites_count', 'in_carts_count'
+    ).get(id=recipe.id)
+
+
+@pytest.mark.django_db
+def test_favorite_and_cart_counters_follow_changes(
+    user_client, make_user, make_recipe
+):
+    recipe = make_recipe()
+    other = make_user()
+    recipe.favorite.add(other)
+    Recipe.objects.filter(id=recipe.id).update(favorites_count=1)
+
+    url = f'/api/recipes/{recipe.id}/'
+    assert user_client.post(url + 'favorite/').status_code == 201
+    assert user_client.post(url + 'favorite/').status_code == 400
+    assert user_client.post(url + 'shopping_cart/').status_code == 201
+    assert counters(recipe) == (2, 1)
+
+    assert user_client.delete(url + 'favorite/').status_code == 204
+    assert user_client.delete(url + 'shopping_cart/').status_code == 204
+    assert user_client.delete(url + 'shopping_cart/').status_code == 400
+    assert counters(recipe) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_bulk_changes_count_only_changed_rows(user_client, make_recipe):
+    first, second = make_recipe(), make_recipe()
+    ids = [first.id, second.id]
+    user_client.post(f'/api/recipes/{first.id}/favorite/')
+
+    response = user_client.post('/api/recipes/favorite/', {'ids': ids},
+                                format='json')
+    assert response.json() == {'added': [second.id]}
+    assert counters(first)[0] == counters(second)[0] == 1
+
+    response = user_client.delete('/api/recipes/favorite/', {'ids': ids},
+                                  format='json')
+    assert sorted(response.json()['removed']) == ids
+    assert counters(first)[0] == counters(second)[0] == 0
+
+
+@pytest.mark.django_db
+def test_author_counters(user_client, make_user, make_recipe):
+    author = make_user()
+    recipe = make_recipe(author=author)
+    make_recipe(author=author)
+    assert user_client.post(
+        f'/api/users/{author.id}/subscribe/'
+    ).status_code == 201
+    author.refresh_from_db()
+    assert (author.recipes_count, author.subscribers_count) == (2, 1)
+
+    recipe.delete()
+    user_client.delete(f'/api/users/{author.id}/subscribe/')
+    author.refresh_from_db()
+    assert (author.recipes_count, author.subscribers_count) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_deleted_user_releases_counters(user, make_user, make_recipe):
+    author = make_user()
+    recipe = make_recipe(author=author)
+    own = make_recipe(author=user)
+    user.subscribe.add(author)
+    recipe.favorite.add(user)
+    recipe.cart.add(user)
+    own.favorite.add(author)
+    rebuild_counters()
+
+    user.delete()
+    author.refresh_from_db()
+    assert (author.recipes_count, author.subscribers_count) == (1, 0)
+    assert counters(recipe) == (0, 0)
+    assert rebuild_counters() == {'recipes': 0, 'users': 0}
+
+
+@pytest.mark.django_db
+def test_rebuild_counters_fixes_drift(user, make_user, make_recipe):
+    recipe = make_recipe()
+    recipe.favorite.add(make_user())
+    Recipe.objects.filter(id=recipe.id).update(in_carts_count=5)
+    User.objects.filter(id=user.id).update(recipes_count=0)
+
+    assert rebuild_counters() == {'recipes': 1, 'users': 1}
+    assert counters(recipe) == (1, 0)
+    user.refresh_from_db()
+    assert user.recipes_count == 1
+    assert rebuild_counters() == {'recipes': 0, 'users': 0}
+
+
+@pytest.mark.django_db
+def test_popularity_ordering_for_anonymous(api_client, make_recipe):
+    recipes = [make_recipe() for _ in range(3)]
+    for recipe, count in zip(recipes, (1, 3, 2)):
+        Recipe.objects.filter(id=recipe.id).update(favorites_count=count)
+
+    response = api_client.get('/api/recipes/', {'ordering': '-popularity'})
+    assert [item['id'] for item in response.json()['results']] == [
+        recipes[1].id, recipes[2].id, recipes[0].id,
+    ]
@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+import pytest
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.paginators import MergedKeysetPagination
+from recipes import feed as feeds
+from recipes.feed import trim_feeds
+from recipes.models import FeedEntry, Recipe, User
+
+
+def walk(client, url, link='next'):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        pages.append([recipe['id'] for recipe in data['results']])
+        url = data[link]
+    return pages, data
+
+
+@pytest.fixture
+def feed(user, user_client, make_user, make_recipe):
+    small, big, stranger = make_user(), make_user(), make_user()
+    User.objects.filter(id=big.id).update(subscribers_count=10)
+    now = timezone.now()
+    recipes = []
+    for author, hours in (
+        (small, 1), (big, 2), (small, 3), (big, 3), (small, 5), (big, 6),
+        (small, 7), (stranger, 4),
+    ):
+        recipe = make_recipe(author=author)
+        Recipe.objects.filter(id=recipe.id).update(
+            pub_date=now - timedelta(hours=hours)
+        )
+        recipes.append((now - timedelta(hours=hours), recipe.id, author))
+    with override_settings(FEED_FANOUT_LIMIT=5):
+        for author in (small, big):
+            response = user_client.post(f'/api/users/{author.id}/subscribe/')
+            assert response.status_code == 201
+    return [
+        recipe_id for _, recipe_id, author in sorted(recipes, reverse=True)
+        if author != stranger
+    ], small, big
+
+
+@pytest.mark.django_db
+@override_settings(FEED_FANOUT_LIMIT=5)
+def test_feed_pages_merge_fanned_out_and_pulled_recipes(
+    user, user_client, feed
+):
+    expected, small, big = feed
+    assert FeedEntry.objects.filter(user=user, author=small).count() == 4
+    assert not FeedEntry.objects.filter(author=big).exists()
+
+    pages, last = walk(user_client, '/api/recipes/feed/?limit=2')
+    assert [recipe_id for page in pages for recipe_id in page] == expected
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+
+    back, _ = walk(user_client, last['previous'], 'previous')
+    assert back == pages[-2::-1]
+
+
+@pytest.mark.django_db
+@override_settings(FEED_FANOUT_LIMIT=5)
+def test_unsubscribe_removes_author_from_feed(user_client, feed):
+    expected, small, big = feed
+    user_client.delete(f'/api/users/{small.id}/subscribe/')
+    pages, _ = walk(user_client, '/api/recipes/feed/?limit=10')
+    assert pages[0] == [
+        recipe_id for recipe_id in expected
+        if Recipe.objects.get(id=recipe_id).author_id == big.id
+    ]
+
+
+@pytest.mark.django_db
+def test_feed_rejects_malformed_cursor(user_client, api_client):
+    assert api_client.get('/api/recipes/feed/').status_code == 401
+    assert user_client.get(
+        '/api/recipes/feed/?cursor=bm90LWpzb24='
+    ).status_code == 404
+
+
+@pytest.mark.django_db
+@override_settings(FEED_FANOUT_LIMIT=5, FEED_MAX_ENTRIES=2)
+def test_trim_keeps_newest_entries(user, feed):
+    expected, small, _ = feed
+    assert trim_feeds() == 2
+    assert list(FeedEntry.objects.filter(user=user).order_by(
+        '-pub_date'
+    ).values_list('recipe', flat=True)) == [
+        recipe_id for recipe_id in expected
+        if Recipe.objects.get(id=recipe_id).author_id == small.id
+    ][:2]
+
+
+@pytest.mark.django_db
+def test_merged_feed_skips_duplicate_recipes(feed):
+    expected, _, _ = feed
+    recipes = Recipe.objects.filter(id__in=expected).annotate(
+        recipe_id=F('id')
+    ).values('pub_date', 'recipe_id')
+    paginator = MergedKeysetPagination()
+    request = Request(APIRequestFactory().get('/', {'limit': 3}))
+    page = paginator.paginate_queryset((recipes, recipes), request)
+    assert [row['recipe_id'] for row in page] == expected[:3]
+    assert paginator.has_next
+
+
+@pytest.mark.django_db
+@override_settings(FEED_FANOUT_LIMIT=5)
+def test_author_crossing_fanout_limit_keeps_feed_complete(
+    monkeypatch, user, user_client, make_user, make_recipe
+):
+    monkeypatch.setattr(
+        feeds.executor, 'submit',
+        lambda function, task, object_id: task(object_id),
+    )
+    author, other = make_user(), make_user()
+    User.objects.filter(id=author.id).update(subscribers_count=4)
+    first = make_recipe(author=author)
+    other_client = APIClient()
+    other_client.force_authenticate(other)
+    url = f'/api/users/{author.id}/subscribe/'
+
+    assert user_client.post(url).status_code == 201
+    assert FeedEntry.objects.filter(user=user, author=author).count() == 1
+
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        assert other_client.post(url).status_code == 201
+    assert not FeedEntry.objects.filter(author=author).exists()
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        second = make_recipe(author=author)
+    Recipe.objects.filter(id=second.id).update(
+        pub_date=first.pub_date + timedelta(hours=1)
+    )
+    assert not FeedEntry.objects.filter(author=author).exists()
+    pages, _ = walk(user_client, '/api/recipes/feed/?limit=1')
+    assert pages == [[second.id], [first.id]]
+
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        assert other_client.delete(url).status_code == 204
+    assert set(FeedEntry.objects.filter(author=author).values_list(
+        'user', 'recipe'
+    )) == {(user.id, first.id), (user.id, second.id)}
+    pages, _ = walk(user_client, '/api/recipes/feed/?limit=1')
+    assert pages == [[second.id], [first.id]]
@@ -0,0 +1,81 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from PIL import Image
+
+from recipes import images
+from recipes.images import build_variants, smallest_variant
+from recipes.models import Recipe
+from recipes.versions import get_version, recipe_version_name
+
+
+def image_file(width, height, mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, (width, height), 'red').save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@pytest.fixture
+def recipe(make_recipe):
+    name = default_storage.save('photo.png', image_file(1000, 500, 'RGBA'))
+    return make_recipe(image=name)
+
+
+@pytest.mark.django_db
+def test_variants_are_built_for_each_width_and_format(recipe):
+    version = get_version(recipe_version_name(recipe.id))
+    build_variants(recipe.id)
+    recipe.refresh_from_db()
+    widths = recipe.image_variants['widths']
+    assert recipe.image_variants['source'] == recipe.image.name
+    assert sorted(widths, key=int) == ['320', '640']
+    for width, formats in widths.items():
+        assert set(formats) == {'webp', 'jpeg'}
+        with default_storage.open(formats['jpeg']) as file:
+            assert Image.open(file).size[0] == int(width)
+    assert smallest_variant(recipe.image_variants) == widths['320']['webp']
+    assert get_version(recipe_version_name(recipe.id)) != version
+
+
+@pytest.mark.django_db
+def test_variants_are_served_with_recipe(api_client, recipe):
+    build_variants(recipe.id)
+    data = api_client.get(f'/api/recipes/{recipe.id}/').json()
+    assert set(data['image_variants']) == {'320', '640'}
+    assert data['image_variants']['320']['webp'].startswith('http://')
+
+
+@pytest.mark.django_db
+def test_replaced_image_drops_old_variants(recipe):
+    build_variants(recipe.id)
+    recipe.refresh_from_db()
+    old = recipe.image_variants
+    Recipe.objects.filter(id=recipe.id).update(
+        image=default_storage.save('other.png', image_file(200, 100))
+    )
+    build_variants(recipe.id)
+    recipe.refresh_from_db()
+    assert list(recipe.image_variants['widths']) == ['200']
+    for formats in old['widths'].values():
+        for path in formats.values():
+            assert not default_storage.exists(path)
+
+
+@pytest.mark.django_db
+def test_saving_new_image_schedules_variants(monkeypatch, recipe):
+    scheduled = []
+    monkeypatch.setattr(
+        images.executor, 'submit',
+        lambda function, recipe_id: scheduled.append(recipe_id),
+    )
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        recipe.save()
+    assert scheduled == [recipe.id]
+    build_variants(recipe.id)
+    recipe.refresh_from_db()
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        recipe.save()
+    assert scheduled == [recipe.id]
@@ -0,0 +1,70 @@
+import pytest
+from django.test import TestCase, override_settings
+
+from api.search import IngredientIndex
+from recipes.versions import INGREDIENTS_VERSION, bump_version
+from recipes.models import Ingredient
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+@pytest.mark.django_db
+def test_search_puts_prefix_matches_before_substring_matches(ingredients):
+    Ingredient.objects.create(name='сахарная пудра', measurement_unit='г')
+    Ingredient.objects.create(name='тростниковый сахар', measurement_unit='г')
+    index = IngredientIndex()
+    assert names(index.search('Сах')) == [
+        'сахар', 'сахарная пудра', 'тростниковый сахар',
+    ]
+
+
+@pytest.mark.django_db
+def test_search_retries_with_keyboard_layout(ingredients):
+    assert names(IngredientIndex().search('vjkjrj')) == ['молоко']
+
+
+@pytest.mark.django_db
+def test_search_without_query_returns_all_rows(ingredients):
+    assert names(IngredientIndex().search()) == [
+        ingredient.name for ingredient in ingredients
+    ]
+
+
+@pytest.mark.django_db
+def test_index_rebuilds_after_ingredient_is_saved(api_client, ingredients):
+    assert api_client.get('/api/ingredients/?name=со').json() == []
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+    response = api_client.get('/api/ingredients/?name=со')
+    assert names(response.json()) == ['соль']
+
+
+@pytest.mark.django_db
+def test_index_sees_version_bumped_by_another_process(ingredients):
+    index = IngredientIndex()
+    assert index.search('соль') == []
+    Ingredient.objects.bulk_create(
+        [Ingredient(name='соль', measurement_unit='г')]
+    )
+    assert index.search('соль') == []
+    bump_version(INGREDIENTS_VERSION)
+    assert names(index.search('соль')) == ['соль']
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCAL_CACHES, INGREDIENT_INDEX_TIMEOUT=0)
+def test_index_expires_when_versions_are_process_local(ingredients):
+    index = IngredientIndex()
+    assert index.search('соль') == []
+    Ingredient.objects.bulk_create(
+        [Ingredient(name='соль', measurement_unit='г')]
+    )
+    assert names(index.search('соль')) == ['соль']
@@ -0,0 +1,62 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.search import IngredientIndex
+from recipes.models import Ingredient
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'name': 'соль', 'measurement_unit': 'г'},
+        {'name': 'перец', 'measurement_unit': 'г'},
+        {'name': 'соль', 'measurement_unit': 'щепотка'},
+    ], ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def load(path, **options):
+    stdout, stderr = StringIO(), StringIO()
+    call_command(
+        'load_ingredients', path, stdout=stdout, stderr=stderr, **options
+    )
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db
+def test_load_upserts_by_name(dump, ingredients):
+    Ingredient.objects.create(name='перец', measurement_unit='шт')
+    stdout, _ = load(dump, batch_size=1)
+    assert dict(Ingredient.objects.filter(
+        name__in=('соль', 'перец')
+    ).values_list('name', 'measurement_unit')) == {
+        'соль': 'щепотка', 'перец': 'г',
+    }
+    assert 'добавлено 1, обновлено 2' in stdout
+
+
+@pytest.mark.django_db
+def test_running_servers_see_loaded_ingredients(dump, ingredients):
+    server_index = IngredientIndex()
+    assert server_index.search('сол') == []
+    _, stderr = load(dump)
+    assert [row['name'] for row in server_index.search('сол')] == ['соль']
+    assert stderr == ''
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCAL_CACHES)
+def test_load_warns_when_versions_are_process_local(dump, ingredients):
+    _, stderr = load(dump)
+    assert 'CACHE_BACKEND' in stderr
@@ -0,0 +1,83 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE_THROUGH_MODELS = ('recipes', '0005_recipe_image_variants')
+
+
+def migrate(targets):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    executor.loader.build_graph()
+    return executor.loader.project_state(targets).apps
+
+
+def objects(apps, model):
+    return apps.get_model('recipes', model).objects
+
+
+def latest():
+    executor = MigrationExecutor(connection)
+    return executor.loader.graph.leaf_nodes()
+
+
+@pytest.mark.django_db
+def test_models_match_migrations():
+    call_command('makemigrations', check=True, dry_run=True, stdout=StringIO())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_favorites_and_carts_survive_migration():
+    leaves = latest()
+    old = migrate([BEFORE_THROUGH_MODELS])
+    users = objects(old, 'User')
+    author = users.create(username='author', email='a@example.com')
+    reader = users.create(username='reader', email='r@example.com')
+    reader.subscribe.add(author)
+    flour = objects(old, 'Ingredient').create(
+        name='мука', measurement_unit='г'
+    )
+    recipes = [
+        objects(old, 'Recipe').create(
+            author=author, name=f'Рецепт {number}', text='Текст',
+            cooking_time=10,
+        )
+        for number in range(2)
+    ]
+    for recipe in recipes:
+        objects(old, 'AmountIngredient').create(
+            recipe=recipe, ingredients=flour, amount=100
+        )
+        recipe.favorite.add(reader)
+        recipe.cart.add(reader)
+    recipes[0].favorite.add(author)
+    try:
+        new = migrate(leaves)
+        favorites = objects(new, 'Favorite')
+        assert set(favorites.values_list('user', 'recipe')) == {
+            (reader.id, recipes[0].id), (reader.id, recipes[1].id),
+            (author.id, recipes[0].id),
+        }
+        assert set(objects(new, 'ShoppingCart').values_list(
+            'user', 'recipe'
+        )) == {
+            (reader.id, recipes[0].id), (reader.id, recipes[1].id),
+        }
+        assert not favorites.filter(created_at__isnull=True).exists()
+        assert dict(objects(new, 'Recipe').values_list(
+            'id', 'favorites_count'
+        )) == {recipes[0].id: 2, recipes[1].id: 1}
+        counts = objects(new, 'User').get(id=author.id)
+        assert (counts.recipes_count, counts.subscribers_count) == (2, 1)
+        assert list(objects(new, 'ShoppingListItem').values_list(
+            'user', 'ingredient', 'amount'
+        )) == [(reader.id, flour.id, 200)]
+        assert set(objects(new, 'FeedEntry').values_list(
+            'user', 'recipe'
+        )) == {(reader.id, recipe.id) for recipe in recipes}
+    finally:
+        migrate(leaves)
@@ -0,0 +1,70 @@
+import json
+from base64 import urlsafe_b64encode
+
+import pytest
+
+
+def cursor(value):
+    return urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def walk(client, url):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        pages.append(data)
+        url = data['next']
+    return pages
+
+
+@pytest.fixture
+def recipes(make_recipe, make_user):
+    return [make_recipe(author=make_user()) for _ in range(7)]
+
+
+@pytest.mark.django_db
+def test_cursor_pages_cover_recipes_once(api_client, recipes):
+    pages = walk(api_client, '/api/recipes/?cursor=&limit=3')
+    ids = [recipe['id'] for page in pages for recipe in page['results']]
+    assert ids == [recipe.id for recipe in reversed(recipes)]
+    assert [len(page['results']) for page in pages] == [3, 3, 1]
+    previous = api_client.get(pages[-1]['previous']).json()
+    assert previous['results'] == pages[1]['results']
+
+
+@pytest.mark.django_db
+def test_cursor_pages_subscriptions(user, user_client, make_user):
+    authors = [make_user() for _ in range(5)]
+    user.subscribe.add(*authors)
+    pages = walk(user_client, '/api/users/subscriptions/?cursor=&limit=2')
+    ids = [author['id'] for page in pages for author in page['results']]
+    assert ids == [author.id for author in authors]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value', (
+    '!!!',
+    cursor([1, False]),
+    cursor({'position': 1, 'reverse': 2}),
+    cursor([['2022-01-01T00:00:00+00:00'], False]),
+    cursor([['2022-01-01T00:00:00+00:00', 1], 'yes']),
+    cursor([['not a date', 1], False]),
+    cursor([[20220101, 1], False]),
+    cursor([[None, 1], False]),
+    cursor([['2022-01-01T00:00:00+00:00', 'one'], False]),
+    cursor([['2022-01-01T00:00:00+00:00', 2 ** 70], False]),
+))
+def test_malformed_cursor_is_not_found(api_client, recipes, value):
+    response = api_client.get('/api/recipes/', {'cursor': value})
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('param', ('ordering', 'search'))
+def test_cursor_rejects_reordering_params(api_client, recipes, param):
+    value = '-popularity' if param == 'ordering' else 'рецепт'
+    response = api_client.get('/api/recipes/', {'cursor': '', param: value})
+    assert response.status_code == 400
+    assert param in response.json()
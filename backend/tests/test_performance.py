@@ -0,0 +1,133 @@
+import logging
+import os
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api import performance
+from backend.metrics import ARCHIVE, archive_worker, write_snapshot
+
+
+@pytest.fixture
+def admin_client(make_user):
+    client = APIClient()
+    client.force_authenticate(make_user(is_staff=True))
+    return client
+
+
+@pytest.mark.django_db
+@override_settings(PERFORMANCE_METRICS=True)
+def test_metrics_require_admin(api_client, user_client, admin_client):
+    assert api_client.get('/api/metrics/').status_code == 401
+    assert user_client.get('/api/metrics/').status_code == 403
+    response = admin_client.get('/api/metrics/')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+
+
+@pytest.mark.django_db
+def test_metrics_disabled_by_default(admin_client):
+    assert admin_client.get('/api/metrics/').status_code == 404
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = performance.Registry()
+    monkeypatch.setattr(performance, 'registry', registry)
+    return registry
+
+
+def server_timing(response):
+    timings = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+def metric_samples(content):
+    return {
+        name: float(value) for name, value in (
+            line.rsplit(' ', 1) for line in content.splitlines()
+            if not line.startswith('#')
+        )
+    }
+
+
+@pytest.mark.django_db
+@override_settings(PERFORMANCE_METRICS=True)
+@pytest.mark.parametrize('path', ('/api/recipes/', '/api/recipes/?limit=1'))
+def test_server_timing_times_fast_list_serialization(
+    api_client, make_recipe, registry, path
+):
+    make_recipe()
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(path)
+    timings = server_timing(response)
+    assert timings['db']['desc'] == f'"{len(context)} queries"'
+    assert float(timings['serializer']['dur']) > 0
+    assert float(timings['view']['dur']) <= float(timings['total']['dur'])
+    assert timings['size']['desc'] == f'"{len(response.content)} bytes"'
+
+
+@pytest.mark.django_db
+@override_settings(PERFORMANCE_METRICS=True, SLOW_REQUEST_MS=0)
+def test_slow_request_log_names_the_action(
+    api_client, make_recipe, registry, caplog
+):
+    recipe = make_recipe()
+    with caplog.at_level(logging.WARNING, logger='api.performance'):
+        api_client.get('/api/recipes/')
+        api_client.get(f'/api/recipes/{recipe.id}/')
+    assert [record.action for record in caplog.records] == [
+        'RecipeViewSet.list', 'RecipeViewSet.retrieve',
+    ]
+    assert caplog.records[0].status_code == 200
+
+
+@pytest.mark.django_db
+@override_settings(PERFORMANCE_METRICS=True)
+def test_histogram_counts_requests_per_action(api_client, registry):
+    for _ in range(3):
+        api_client.get('/api/tags/')
+    api_client.get('/api/recipes/')
+    samples = metric_samples(registry.render())
+    label = f'action="TagViewSet.list",pid="{os.getpid()}"'
+    assert samples[f'foodgram_request_duration_seconds_count{{{label}}}'] == 3
+    assert samples[
+        f'foodgram_request_duration_seconds_bucket{{{label},le="+Inf"}}'
+    ] == 3
+    assert any('action="RecipeViewSet.list"' in name for name in samples)
+
+
+@pytest.mark.django_db
+def test_metrics_dir_sums_workers(
+    tmp_path, api_client, admin_client, registry
+):
+    worker = performance.Histogram()
+    worker.observe(0.2, 5)
+    write_snapshot(
+        str(tmp_path / '1.json'), {'TagViewSet.list': worker.snapshot()}
+    )
+    write_snapshot(
+        str(tmp_path / '2.json'), {'TagViewSet.list': worker.snapshot()}
+    )
+    archive_worker(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ['1.json', ARCHIVE]
+
+    with override_settings(
+        PERFORMANCE_METRICS=True, PERFORMANCE_METRICS_DIR=str(tmp_path)
+    ):
+        response = api_client.get('/api/tags/')
+        samples = metric_samples(
+            admin_client.get('/api/metrics/').content.decode()
+        )
+    label = 'action="TagViewSet.list"'
+    assert samples[f'foodgram_request_duration_seconds_count{{{label}}}'] == 3
+    queries = server_timing(response)['db']['desc'].strip('"').split()[0]
+    assert samples[f'foodgram_request_queries_total{{{label}}}'] == (
+        10 + int(queries)
+    )
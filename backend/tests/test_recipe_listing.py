@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from django.core.cache import caches
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+
+VIEWS = {
+    'fast': RecipeViewSet.as_view(
+        {'get': 'list'}, renderer_classes=(JSONRenderer,),
+    ),
+    'serializers': RecipeViewSet.as_view(
+        {'get': 'list'}, fast_list=False, renderer_classes=(JSONRenderer,),
+    ),
+}
+
+
+def list_recipes(view, user=None, **params):
+    for cache in caches.all():
+        cache.clear()
+    request = APIRequestFactory().get('/api/recipes/', params)
+    if user is not None:
+        force_authenticate(request, user)
+    response = VIEWS[view](request)
+    assert response.status_code == 200
+    return json.loads(response.render().content)
+
+
+@pytest.fixture
+def recipes(user, make_user, make_recipe, tags, ingredients):
+    breakfast, lunch, dinner = tags
+    flour, milk, eggs, sugar = ingredients
+    author = make_user()
+    user.subscribe.add(author)
+    recipes = [
+        make_recipe(
+            author=author, tags=[dinner, breakfast],
+            ingredients=[(sugar, 5), (flour, 200), (eggs, 2)],
+            image_variants={'widths': {'320': {'webp': 'variants/1.webp'}}},
+        ),
+        make_recipe(tags=[lunch], ingredients=[(milk, 300), (flour, 100)]),
+        make_recipe(image=''),
+    ]
+    user.favorites.add(recipes[0])
+    user.carts.add(recipes[1])
+    return recipes
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', (
+    {}, {'limit': 2, 'page': 2}, {'is_favorited': 1}, {'tags': 'breakfast'},
+))
+def test_fast_list_matches_serializers(user, recipes, params):
+    for current in (user, None):
+        fast = list_recipes('fast', current, **params)
+        assert fast == list_recipes('serializers', current, **params)
+    assert fast['results']
+
+
+@pytest.mark.django_db
+def test_nested_lists_have_stable_order(user, recipes):
+    recipe = list_recipes('fast', user)['results'][-1]
+    assert [tag['slug'] for tag in recipe['tags']] == ['breakfast', 'dinner']
+    assert [item['name'] for item in recipe['ingredients']] == [
+        'сахар', 'мука', 'яйца',
+    ]
+    assert recipe['is_favorited'] and recipe['author']['is_subscribed']
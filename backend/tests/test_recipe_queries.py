@@ -0,0 +1,51 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+
+def count_queries(function):
+    with CaptureQueriesContext(connection) as context:
+        function()
+    return len(context)
+
+
+def create_recipes(make_recipe, make_user, tags, ingredients, total):
+    for number in range(total):
+        make_recipe(
+            author=make_user(),
+            tags=tags[:number % len(tags) + 1],
+            ingredients=[(ingredient, 10) for ingredient in ingredients],
+        )
+
+
+@pytest.mark.django_db
+def test_read_serializer_queries_do_not_grow_with_recipes(
+    make_recipe, make_user, user, tags, ingredients
+):
+    request = APIRequestFactory().get('/api/recipes/')
+    request.user = user
+
+    def serialize():
+        return RecipeReadSerializer(
+            Recipe.objects.with_user_data(user), many=True,
+            context={'request': request},
+        ).data
+
+    create_recipes(make_recipe, make_user, tags, ingredients, 2)
+    few = count_queries(serialize)
+    create_recipes(make_recipe, make_user, tags, ingredients, 6)
+    assert count_queries(serialize) == few
+
+
+@pytest.mark.django_db
+def test_recipe_list_queries_do_not_grow_with_page_size(
+    make_recipe, make_user, user_client, tags, ingredients
+):
+    create_recipes(make_recipe, make_user, tags, ingredients, 8)
+    few = count_queries(lambda: user_client.get('/api/recipes/?limit=2'))
+    many = count_queries(lambda: user_client.get('/api/recipes/?limit=8'))
+    assert many == few
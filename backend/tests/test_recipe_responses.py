@@ -0,0 +1,63 @@
+import pytest
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+    },
+}
+
+
+def names(client):
+    return [
+        recipe['name']
+        for recipe in client.get('/api/recipes/').json()['results']
+    ]
+
+
+@pytest.mark.django_db
+def test_cached_list_follows_recipe_edits(
+    api_client, user_client, make_recipe
+):
+    recipe = make_recipe(name='Блины')
+    assert names(api_client) == ['Блины']
+    Recipe.objects.filter(id=recipe.id).update(name='Оладьи')
+    assert names(api_client) == ['Блины']
+
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        response = user_client.patch(
+            f'/api/recipes/{recipe.id}/', {'name': 'Сырники'}, format='json'
+        )
+    assert response.status_code == 200
+    assert names(api_client) == ['Сырники']
+
+
+@pytest.mark.django_db
+def test_cached_detail_follows_author_edits(user, api_client, make_recipe):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.id}/'
+    assert api_client.get(url).json()['author']['first_name'] == 'Имя'
+
+    user.first_name = 'Пётр'
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        user.save()
+    assert api_client.get(url).json()['author']['first_name'] == 'Пётр'
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCAL_CACHES)
+def test_local_cache_disables_response_caching(api_client, make_recipe):
+    recipe = make_recipe(name='Блины')
+    url = f'/api/recipes/{recipe.id}/'
+    assert names(api_client) == ['Блины']
+    assert api_client.get(url).json()['name'] == 'Блины'
+
+    Recipe.objects.filter(id=recipe.id).update(name='Оладьи')
+    assert names(api_client) == ['Оладьи']
+    assert api_client.get(url).json()['name'] == 'Оладьи'
@@ -0,0 +1,44 @@
+import pytest
+from django.test import TestCase
+
+
+def search(client, value, **params):
+    response = client.get('/api/recipes/', {'search': value, **params})
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def recipes(make_recipe, tags):
+    return [
+        make_recipe(name='Блины на молоке', text='Тонкие блины.',
+                    tags=tags[:1]),
+        make_recipe(name='Оладьи', text='Пышнее, чем блины.', tags=tags[1:2]),
+        make_recipe(name='Борщ', text='Со сметаной.', tags=tags[1:2]),
+    ]
+
+
+@pytest.mark.django_db
+def test_name_matches_rank_above_text_matches(api_client, recipes):
+    assert search(api_client, 'блины') == ['Блины на молоке', 'Оладьи']
+
+
+@pytest.mark.django_db
+def test_search_matches_word_prefixes(api_client, recipes):
+    assert search(api_client, 'борщ') == ['Борщ']
+    assert search(api_client, 'олад') == ['Оладьи']
+
+
+@pytest.mark.django_db
+def test_search_combines_with_filters(api_client, recipes):
+    assert search(api_client, 'блины', tags='lunch') == ['Оладьи']
+
+
+@pytest.mark.django_db
+def test_search_follows_renamed_recipes(api_client, recipes):
+    recipe = recipes[2]
+    recipe.name = 'Щи'
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        recipe.save()
+    assert search(api_client, 'борщ') == []
+    assert search(api_client, 'щи') == ['Щи']
@@ -0,0 +1,113 @@
+import pytest
+from django.test import TestCase
+
+from recipes.versions import (cart_version_name, get_version,
+                              recipe_version_name)
+
+
+def shopping_list(client):
+    return b''.join(
+        client.get('/api/recipes/download_shopping_cart/')
+    ).decode().splitlines()
+
+
+@pytest.fixture
+def recipe(make_recipe, tags, ingredients):
+    flour, milk, *_ = ingredients
+    return make_recipe(tags=tags[:1], ingredients=[(flour, 200), (milk, 300)])
+
+
+@pytest.mark.django_db
+def test_ingredient_edit_bumps_cart_versions_after_commit(
+    user, user_client, recipe, ingredients
+):
+    user.carts.add(recipe)
+    cart_version = get_version(cart_version_name(user.id))
+    recipe_version = get_version(recipe_version_name(recipe.id))
+    with TestCase.captureOnCommitCallbacks() as callbacks:
+        response = user_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {'ingredients': [{'id': ingredients[0].id, 'amount': 50}]},
+            format='json',
+        )
+    assert response.status_code == 200
+    assert get_version(cart_version_name(user.id)) == cart_version
+    assert get_version(recipe_version_name(recipe.id)) == recipe_version
+    for callback in callbacks:
+        callback()
+    assert get_version(cart_version_name(user.id)) != cart_version
+    assert get_version(recipe_version_name(recipe.id)) != recipe_version
+
+
+@pytest.mark.django_db
+def test_shopping_list_follows_recipe_edits(
+    user_client, recipe, ingredients
+):
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert shopping_list(user_client) == ['молоко - 300 мл ', 'мука - 200 г ']
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        user_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {'ingredients': [
+                {'id': ingredients[0].id, 'amount': 50},
+                {'id': ingredients[2].id, 'amount': 3},
+            ]},
+            format='json',
+        )
+    assert shopping_list(user_client) == ['мука - 50 г ', 'яйца - 3 шт ']
+
+
+@pytest.mark.django_db
+def test_recipe_delete_bumps_cart_versions_after_commit(
+    user, user_client, recipe
+):
+    user.carts.add(recipe)
+    version = get_version(cart_version_name(user.id))
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        assert user_client.delete(
+            f'/api/recipes/{recipe.id}/'
+        ).status_code == 204
+    assert get_version(cart_version_name(user.id)) != version
+
+
+def admin_form(recipe, ingredients, **fields):
+    data = {
+        'name': recipe.name,
+        'cooking_time': recipe.cooking_time,
+        'author': recipe.author_id,
+        'tags': [tag.id for tag in recipe.tags.all()],
+        'text': recipe.text,
+        'ingredient-TOTAL_FORMS': len(ingredients),
+        'ingredient-INITIAL_FORMS': len(ingredients),
+        'ingredient-MIN_NUM_FORMS': 0,
+        'ingredient-MAX_NUM_FORMS': 1000,
+    }
+    for number, item in enumerate(ingredients):
+        data.update({
+            f'ingredient-{number}-id': item.id,
+            f'ingredient-{number}-recipe': recipe.id,
+            f'ingredient-{number}-ingredients': item.ingredients_id,
+            f'ingredient-{number}-amount': item.amount,
+        })
+    data.update(fields)
+    return data
+
+
+@pytest.mark.django_db
+def test_admin_edit_bumps_cart_versions_after_commit(
+    admin_client, user, recipe
+):
+    user.carts.add(recipe)
+    version = get_version(cart_version_name(user.id))
+    items = list(recipe.ingredient.order_by('id'))
+    form = admin_form(recipe, items, **{'ingredient-0-amount': 1})
+    with TestCase.captureOnCommitCallbacks() as callbacks:
+        response = admin_client.post(
+            f'/admin/recipes/recipe/{recipe.id}/change/', form
+        )
+    assert response.status_code == 302
+    assert get_version(cart_version_name(user.id)) == version
+    for callback in callbacks:
+        callback()
+    assert get_version(cart_version_name(user.id)) != version
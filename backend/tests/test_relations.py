@@ -0,0 +1,66 @@
+import pytest
+
+from recipes import relations
+from recipes.models import Favorite
+
+
+@pytest.fixture(params=(True, False), ids=('returning', 'select'))
+def returning(request, monkeypatch):
+    monkeypatch.setattr(relations, 'can_return_rows', lambda: request.param)
+    return request.param
+
+
+@pytest.mark.django_db
+def test_bulk_add_and_remove_report_changed_ids(
+    returning, user, user_client, make_recipe
+):
+    kept, added = make_recipe(), make_recipe()
+    user.favorites.add(kept)
+    missing = added.id + 100
+
+    response = user_client.post(
+        '/api/recipes/favorite/', [kept.id, added.id, missing], format='json'
+    )
+    assert response.status_code == 200
+    assert response.json() == {'added': [added.id]}
+    assert set(user.favorites.values_list('id', flat=True)) == {
+        kept.id, added.id,
+    }
+    assert not Favorite.objects.filter(created_at__isnull=True).exists()
+
+    response = user_client.delete(
+        '/api/recipes/favorite/', {'ids': [added.id, missing]}, format='json'
+    )
+    assert response.json() == {'removed': [added.id]}
+    assert list(user.favorites.values_list('id', flat=True)) == [kept.id]
+
+
+@pytest.mark.django_db
+def test_bulk_subscribe_ignores_unknown_users(user, user_client, make_user):
+    author = make_user()
+    response = user_client.post(
+        '/api/users/subscribe/', {'ids': [author.id, author.id + 100]},
+        format='json',
+    )
+    assert response.json() == {'added': [author.id]}
+    assert list(user.subscribe.values_list('id', flat=True)) == [author.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('payload', (
+    {}, {'ids': []}, {'ids': [0]}, {'ids': ['x']}, {'ids': [1] * 1001},
+))
+def test_bulk_rejects_invalid_ids(user_client, payload):
+    response = user_client.post(
+        '/api/recipes/shopping_cart/', payload, format='json'
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_bulk_requires_authentication(api_client, make_recipe):
+    recipe = make_recipe()
+    response = api_client.post(
+        '/api/recipes/shopping_cart/', [recipe.id], format='json'
+    )
+    assert response.status_code == 401
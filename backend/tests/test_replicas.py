@@ -0,0 +1,113 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APIClient
+
+from backend.db.routers import PIN_COOKIE, ReplicaMiddleware, read_database
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+AUTHORIZATION = 'Token 0123456789abcdef'
+
+
+@pytest.fixture
+def middleware():
+    def get_response(request):
+        response = HttpResponse()
+        response.read_database = read_database.get()
+        return response
+
+    with override_settings(DATABASE_REPLICAS=['replica1']):
+        yield ReplicaMiddleware(get_response)
+
+
+def read_alias(middleware, **headers):
+    return middleware(
+        RequestFactory().get('/api/recipes/', **headers)
+    ).read_database
+
+
+def write(middleware, **headers):
+    return middleware(RequestFactory().post('/api/recipes/', **headers))
+
+
+def test_reads_go_to_replica(middleware):
+    assert read_alias(middleware) == 'replica1'
+    assert write(middleware).read_database is None
+
+
+def test_write_pins_client_by_cookie(middleware):
+    response = write(middleware)
+    cookie = response.cookies[PIN_COOKIE]
+    assert cookie['max-age'] == 5
+    assert cookie['httponly']
+    assert read_alias(
+        middleware, HTTP_COOKIE=f'{PIN_COOKIE}={cookie.value}'
+    ) is None
+
+
+def test_write_pins_token_client_in_shared_cache(middleware):
+    write(middleware, HTTP_AUTHORIZATION=AUTHORIZATION)
+    assert read_alias(middleware, HTTP_AUTHORIZATION=AUTHORIZATION) is None
+    assert read_alias(
+        middleware, HTTP_AUTHORIZATION='Token other'
+    ) == 'replica1'
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+def test_process_local_cache_pins_by_cookie_only(middleware):
+    response = write(middleware, HTTP_AUTHORIZATION=AUTHORIZATION)
+    assert read_alias(
+        middleware, HTTP_AUTHORIZATION=AUTHORIZATION
+    ) == 'replica1'
+    assert read_alias(
+        middleware, HTTP_AUTHORIZATION=AUTHORIZATION,
+        HTTP_COOKIE=f'{PIN_COOKIE}={response.cookies[PIN_COOKIE].value}',
+    ) is None
+
+
+def recipe_ids(client):
+    response = client.get('/api/recipes/')
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(DATABASE_REPLICAS=['replica1'])
+def test_reads_hit_replica_until_client_writes(user, make_recipe):
+    synced = make_recipe()
+    call_command('sync_replicas', stdout=StringIO())
+    fresh = make_recipe()
+    client = APIClient()
+    client.force_authenticate(user)
+    assert recipe_ids(client) == [synced.id]
+
+    response = client.post(f'/api/recipes/{fresh.id}/favorite/')
+    assert response.status_code == 201
+    assert PIN_COOKIE in response.cookies
+    assert sorted(recipe_ids(client)) == [synced.id, fresh.id]
+    other = APIClient()
+    other.force_authenticate(user)
+    assert recipe_ids(other) == [synced.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path', (
+    '/api/recipes/{recipe}/favorite/', '/api/recipes/{recipe}/shopping_cart/',
+    '/api/users/{author}/subscribe/',
+))
+def test_relation_actions_do_not_write_on_get(
+    user, user_client, make_user, make_recipe, path
+):
+    recipe, author = make_recipe(), make_user()
+    response = user_client.get(path.format(recipe=recipe.id, author=author.id))
+    assert response.status_code == 405
+    assert not user.favorites.exists()
+    assert not user.carts.exists()
+    assert not user.subscribe.exists()
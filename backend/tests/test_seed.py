@@ -0,0 +1,47 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from recipes.counters import rebuild_counters
+from recipes.models import FeedEntry, Recipe, ShoppingListItem, Tag, User
+from recipes.versions import RECIPES_VERSION, TAGS_VERSION, get_version
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+def seed():
+    stdout, stderr = StringIO(), StringIO()
+    call_command(
+        'seed', '--favorites=0-5', '--carts=1-3', '--subscriptions=1-4',
+        users=20, recipes=30, tags=4, ingredients=15, workers=1,
+        stdout=stdout, stderr=stderr,
+    )
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_seed_fills_denormalized_data_and_bumps_versions():
+    versions = get_version(TAGS_VERSION), get_version(RECIPES_VERSION)
+    _, stderr = seed()
+    assert (User.objects.count(), Recipe.objects.count()) == (20, 30)
+    assert Tag.objects.count() == 4
+    assert ShoppingListItem.objects.exists()
+    assert FeedEntry.objects.exists()
+    assert rebuild_counters() == {'recipes': 0, 'users': 0}
+    assert (get_version(TAGS_VERSION), get_version(RECIPES_VERSION)) != (
+        versions
+    )
+    assert stderr == ''
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(CACHES=LOCAL_CACHES)
+def test_seed_warns_when_versions_are_local():
+    _, stderr = seed()
+    assert 'CACHE_BACKEND' in stderr
@@ -0,0 +1,178 @@
+import json
+import re
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from fontTools.ttLib import TTFont
+from rest_framework.authtoken.models import Token
+
+from api.exports import shopping_list_cache_key
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import rebuild_all_shopping_lists
+from .test_asgi import asgi_get
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+@pytest.fixture
+def cart(make_recipe, user_client, ingredients):
+    flour, milk, eggs, _ = ingredients
+    recipes = [
+        make_recipe(ingredients=[(flour, 200), (milk, 300)]),
+        make_recipe(ingredients=[(flour, 100), (eggs, 2)]),
+    ]
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        for recipe in recipes:
+            response = user_client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+            assert response.status_code == 201
+    return recipes
+
+
+def download(client, file_format):
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?file_format={file_format}'
+    )
+    assert response.status_code == 200
+    return b''.join(response)
+
+
+def embedded_font(content):
+    number = re.search(rb'/FontFile2 (\d+) 0 R', content).group(1)
+    stream = re.search(
+        rb'\n' + number + rb' 0 obj\n<< /Length (\d+) >>\nstream\n', content
+    )
+    return TTFont(BytesIO(
+        content[stream.end():stream.end() + int(stream.group(1))]
+    ))
+
+
+@pytest.mark.django_db
+def test_shopping_list_sums_amounts(user_client, cart):
+    assert download(user_client, 'txt').decode().splitlines() == [
+        'молоко - 300 мл ', 'мука - 300 г ', 'яйца - 2 шт ',
+    ]
+    assert json.loads(download(user_client, 'json')) == [
+        {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 300},
+        {'name': 'мука', 'measurement_unit': 'г', 'amount': 300},
+        {'name': 'яйца', 'measurement_unit': 'шт', 'amount': 2},
+    ]
+    assert download(user_client, 'csv').decode().splitlines()[1:] == [
+        'молоко,300,мл', 'мука,300,г', 'яйца,2,шт',
+    ]
+
+
+@pytest.mark.django_db
+def test_empty_cart_is_rejected(user_client):
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_pdf_embeds_font_with_cyrillic_glyphs(user_client, cart):
+    content = download(user_client, 'pdf')
+    assert content.startswith(b'%PDF-1.4')
+    assert b'/Encoding /Identity-H' in content
+    font = embedded_font(content)
+    order = font.getGlyphOrder()
+    for char in 'молокшт':
+        glyph = re.search(
+            rb'<([0-9A-F]{4})> <' + f'{ord(char):04X}'.encode() + rb'>',
+            content,
+        ).group(1)
+        assert font['glyf'][order[int(glyph, 16)]].numberOfContours != 0
+
+
+@pytest.mark.django_db
+def test_cached_list_changes_with_cart(user_client, cart):
+    first = download(user_client, 'txt')
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        user_client.delete(f'/api/recipes/{cart[1].id}/shopping_cart/')
+    assert download(user_client, 'txt') != first
+    assert download(user_client, 'txt').decode().splitlines() == [
+        'молоко - 300 мл ', 'мука - 200 г ',
+    ]
+
+
+@pytest.mark.django_db
+def test_list_is_streamed_and_cached_once_complete(user, user_client, cart):
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert response.streaming
+    cache_key = shopping_list_cache_key(user, 'txt')
+    assert cache.get(cache_key) is None
+    content = b''.join(response)
+    assert cache.get(cache_key) == content
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert not response.streaming
+    assert response.content == content
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCAL_CACHES)
+def test_process_local_versions_disable_list_cache(user, user_client, cart):
+    download(user_client, 'txt')
+    ShoppingListItem.objects.filter(user=user).update(amount=1)
+    assert download(user_client, 'txt').decode().splitlines() == [
+        'молоко - 1 мл ', 'мука - 1 г ', 'яйца - 1 шт ',
+    ]
+
+
+def list_items(user):
+    return dict(ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'amount'
+    ))
+
+
+@pytest.mark.django_db
+def test_list_items_follow_every_cart_change(
+    user, user_client, make_user, cart, ingredients
+):
+    flour, milk, eggs, sugar = ingredients
+    other = make_user()
+    other.carts.add(cart[0])
+    assert list_items(user) == {'мука': 300, 'молоко': 300, 'яйца': 2}
+
+    user_client.patch(f'/api/recipes/{cart[1].id}/', {'ingredients': [
+        {'id': flour.id, 'amount': 50}, {'id': sugar.id, 'amount': 10},
+    ]}, format='json')
+    assert list_items(user) == {'мука': 250, 'молоко': 300, 'сахар': 10}
+
+    user_client.delete('/api/recipes/shopping_cart/', [cart[1].id],
+                       format='json')
+    assert list_items(user) == {'мука': 200, 'молоко': 300}
+
+    cart[0].delete()
+    assert list_items(user) == list_items(other) == {}
+    assert rebuild_all_shopping_lists() == (0, 0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_rebuild_fixes_drifted_list_items(user, cart, ingredients):
+    flour, milk, eggs, sugar = ingredients
+    ShoppingListItem.objects.filter(ingredient=flour).update(amount=1)
+    ShoppingListItem.objects.filter(ingredient=milk).delete()
+    ShoppingListItem.objects.create(user=user, ingredient=sugar, amount=5)
+
+    assert rebuild_all_shopping_lists(dry_run=True) == (1, 1, 1, 1)
+    assert rebuild_all_shopping_lists() == (1, 1, 1, 1)
+    assert list_items(user) == {'мука': 300, 'молоко': 300, 'яйца': 2}
+
+
+@pytest.mark.django_db
+def test_download_under_asgi(user, cart):
+    token = Token.objects.create(user=user)
+    status, content = asgi_get(
+        '/api/recipes/download_shopping_cart/',
+        authorization=f'Token {token.key}',
+    )
+    assert status == 200
+    assert content.decode().splitlines() == [
+        'молоко - 300 мл ', 'мука - 300 г ', 'яйца - 2 шт ',
+    ]
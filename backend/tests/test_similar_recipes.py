@@ -0,0 +1,76 @@
+import pytest
+from django.test import override_settings
+
+from recipes import admin, similar
+from recipes.models import SimilarRecipe
+
+from .test_recipe_writes import admin_form
+
+
+def similar_lists():
+    lists = {}
+    for owner, similar_id in SimilarRecipe.objects.order_by(
+        'recipe', '-score', 'similar'
+    ).values_list('recipe', 'similar'):
+        lists.setdefault(owner, []).append(similar_id)
+    return lists
+
+
+@pytest.fixture
+def recipes(make_recipe, ingredients):
+    flour, milk, eggs, sugar = ingredients
+    return (
+        make_recipe(ingredients=[(flour, 100), (milk, 200)]),
+        make_recipe(ingredients=[(flour, 100), (milk, 200), (eggs, 2)]),
+        make_recipe(ingredients=[(eggs, 2), (sugar, 10)]),
+    )
+
+
+@pytest.mark.django_db
+@override_settings(SIMILAR_RECIPES_TOP=2)
+def test_update_keeps_owners_outside_fanout(monkeypatch, recipes):
+    similar.build_index_per_recipe(100)
+    expected = similar_lists()
+    monkeypatch.setattr(similar, 'REVERSE_FANOUT', 0)
+    similar.update_recipe(recipes[0].id)
+    assert similar_lists() == expected
+
+
+@pytest.mark.django_db
+@override_settings(SIMILAR_RECIPES_TOP=2)
+def test_update_recomputes_owners_that_lost_recipe(recipes, ingredients):
+    first, second, third = recipes
+    similar.build_index_per_recipe(100)
+    first.ingredient.all().delete()
+    first.ingredient.create(ingredients=ingredients[3], amount=5)
+    similar.update_recipe(first.id)
+    lists = similar_lists()
+    assert lists[first.id] == [third.id]
+    assert lists[second.id] == [third.id]
+    assert lists[third.id] == [first.id, second.id]
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(admin, 'schedule_update', calls.append)
+    return calls
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fields, expected', (
+    ({'name': 'Другое название'}, False),
+    ({'ingredient-0-amount': 1}, True),
+    ({'tags': []}, True),
+))
+def test_admin_schedules_only_on_tag_or_ingredient_change(
+    admin_client, scheduled, recipes, tags, fields, expected
+):
+    recipe = recipes[0]
+    recipe.tags.set(tags[:1])
+    form = admin_form(recipe, list(recipe.ingredient.order_by('id')), **fields)
+    response = admin_client.post(
+        f'/admin/recipes/recipe/{recipe.id}/change/', form
+    )
+    assert response.status_code == 302
+    assert scheduled == ([recipe.id] if expected else [])
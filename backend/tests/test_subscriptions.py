@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def subscriptions_queries(client, query=''):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(f'/api/users/subscriptions/{query}')
+    assert response.status_code == 200
+    return len(context), response.json()
+
+
+@pytest.mark.django_db
+def test_subscriptions_queries_do_not_grow_with_authors(
+    make_user, make_recipe, user, user_client
+):
+    def subscribe(total):
+        for _ in range(total):
+            author = make_user()
+            for _ in range(3):
+                make_recipe(author=author)
+            user.subscribe.add(author)
+
+    subscribe(1)
+    few, _ = subscriptions_queries(user_client)
+    subscribe(4)
+    many, data = subscriptions_queries(user_client)
+    assert many == few
+    assert data['count'] == 5
+
+
+@pytest.mark.django_db
+def test_subscriptions_limit_recipes_per_author(
+    make_user, make_recipe, user, user_client
+):
+    authors = [make_user(), make_user()]
+    for author in authors:
+        for _ in range(3):
+            make_recipe(author=author)
+    user.subscribe.add(*authors)
+    _, data = subscriptions_queries(user_client, '?recipes_limit=2')
+    assert [len(author['recipes']) for author in data['results']] == [2, 2]
+    assert [author['recipes_count'] for author in data['results']] == [3, 3]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipes_limit', ('abc', '-1', '1.5'))
+def test_invalid_recipes_limit_is_rejected(
+    make_user, user, user_client, recipes_limit
+):
+    author = make_user()
+    user.subscribe.add(author)
+    response = user_client.get(
+        f'/api/users/subscriptions/?recipes_limit={recipes_limit}'
+    )
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.json()
+    assert user_client.post(
+        f'/api/users/{author.id}/subscribe/?recipes_limit={recipes_limit}'
+    ).status_code == 400
+
+
+@pytest.mark.django_db
+def test_subscribe_response_uses_recipes_limit(
+    make_user, make_recipe, user_client
+):
+    author = make_user()
+    for _ in range(3):
+        make_recipe(author=author)
+    response = user_client.post(
+        f'/api/users/{author.id}/subscribe/?recipes_limit=0'
+    )
+    assert response.status_code == 201
+    assert response.json()['recipes'] == []
+    _, data = subscriptions_queries(user_client, '?recipes_limit=1')
+    assert len(data['results'][0]['recipes']) == 1
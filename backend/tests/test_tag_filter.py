@@ -0,0 +1,37 @@
+import pytest
+from django.test import TestCase
+
+from recipes.models import Tag
+
+
+def recipe_ids(client, *slugs):
+    response = client.get('/api/recipes/', {'tags': slugs})
+    assert response.status_code == 200
+    return sorted(recipe['id'] for recipe in response.json()['results'])
+
+
+@pytest.mark.django_db
+def test_filter_by_any_of_tag_slugs(api_client, make_recipe, tags):
+    breakfast, lunch, dinner = tags
+    first = make_recipe(tags=[breakfast, lunch])
+    second = make_recipe(tags=[dinner])
+    make_recipe()
+
+    assert recipe_ids(api_client, 'breakfast') == [first.id]
+    assert recipe_ids(api_client, 'lunch', 'dinner') == [first.id, second.id]
+    assert api_client.get(
+        '/api/recipes/', {'tags': 'unknown'}
+    ).status_code == 400
+
+
+@pytest.mark.django_db
+def test_new_tag_slug_is_filterable_after_commit(
+    api_client, make_recipe, tags
+):
+    assert recipe_ids(api_client, 'breakfast') == []
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        brunch = Tag.objects.create(
+            name='Бранч', color='FFAA00', slug='brunch'
+        )
+    recipe = make_recipe(tags=[brunch])
+    assert recipe_ids(api_client, 'brunch') == [recipe.id]